@@ -0,0 +1,134 @@
+# backend/api/addresses.py
+import bisect
+from dataclasses import dataclass
+
+from api.changefeed import ChangeLogFollower
+
+SUGGEST_MAX_LIMIT = 20
+# prefix matches looked at before ranking (see AddressIndex.suggest)
+SUGGEST_SCAN = 200
+
+@dataclass
+class Address:
+    label: str                  # as BVK spells it, e.g. 'Звездара, Булевар краља Александра 73'
+    key: str                    # normalize_key(label)
+    seen: int = 0               # incidents at this address, live and archived
+    lat: float | None = None
+    lon: float | None = None
+
+class AddressIndex:
+    """
+    Prefix index over every address the scraper has seen plus the municipality
+    names. Keys are normalize_key() strings (so Cyrillic, Latin and diacritic-free
+    input all match) held in one sorted list: a lookup is a bisect to the first
+    key >= prefix and a short forward scan. Each address is indexed under its full
+    text and under the street alone, so 'bulevar kr' finds it without the municipality.
+    The text helpers (cyrtranslit, unidecode) load with the first index, not with the API.
+    """
+
+    def __init__(self):
+        self.keys: list[tuple[str, int]] = []       # (key, address number), sorted
+        self.addresses: list[Address] = []
+        self.by_label: dict[str, int] = {}
+
+    @classmethod
+    def build(cls, rows) -> "AddressIndex":
+        """From (label, seen, lat, lon) tuples, sorting the keys once instead of insort per address."""
+        index = cls()
+        index._insort = False
+        for row in rows:
+            index.add(*row)
+        index.keys.sort()
+        del index._insort
+        return index
+
+    _insort = True
+
+    def add(self, label: str, seen: int = 1, lat: float | None = None, lon: float | None = None):
+        from worker.parser import split_address
+        from worker.textnorm import normalize_key
+        label = " ".join((label or "").split())
+        if not label:
+            return
+        n = self.by_label.get(label)
+        if n is not None:
+            a = self.addresses[n]
+            a.seen += seen
+            if a.lat is None and lat is not None:
+                a.lat, a.lon = lat, lon
+            return
+        n = self.by_label[label] = len(self.addresses)
+        a = Address(label, normalize_key(label), seen, lat, lon)
+        self.addresses.append(a)
+        _, street = split_address(label)
+        for key in {a.key, normalize_key(street)}:
+            if not key:
+                continue
+            if self._insort:
+                bisect.insort(self.keys, (key, n))
+            else:
+                self.keys.append((key, n))
+
+    def suggest(self, q: str, limit: int = 8) -> list[Address]:
+        """
+        Up to `limit` addresses with a key starting with normalize_key(q): full-text
+        matches first, then the most seen. Only the first SUGGEST_SCAN keys of the
+        prefix range (alphabetically) are ranked, so for a short prefix a frequent
+        address further down the alphabet can be missed until the prefix narrows;
+        that bounds the cost of the first keystrokes.
+        """
+        from worker.textnorm import normalize_key
+        prefix = normalize_key(q)
+        if not prefix:
+            return []
+        found: dict[int, int] = {}                   # address number -> 0 if the full text matched, else 1
+        i = bisect.bisect_left(self.keys, (prefix, -1))
+        while i < len(self.keys) and len(found) < SUGGEST_SCAN:
+            key, n = self.keys[i]
+            if not key.startswith(prefix):
+                break
+            found[n] = min(found.get(n, 1), 0 if self.addresses[n].key == key else 1)
+            i += 1
+        best = sorted(found, key=lambda n: (found[n], -self.addresses[n].seen, self.addresses[n].label))
+        return [self.addresses[n] for n in best[:limit]]
+
+class IncidentAddresses(ChangeLogFollower):
+    """
+    AddressIndex for /addresses/suggest: built once from incident and
+    incident_history, then extended from the change log on every
+    incident_changes NOTIFY (addresses are never removed; they were seen).
+    """
+
+    name = "addresses"
+    fields = ("id", "address_text", "lat", "lon")
+
+    def __init__(self):
+        super().__init__()
+        self.index = AddressIndex()
+        self.max_id = 0
+
+    async def _build(self, conn) -> AddressIndex:
+        from worker.parser import OPS
+        rows = await conn.fetch("""
+            SELECT address_text, count(*) AS seen, avg(lat) AS lat, avg(lon) AS lon
+            FROM (SELECT address_text, lat, lon FROM incident
+                  UNION ALL
+                  SELECT address_text, lat, lon FROM incident_history) a
+            WHERE address_text IS NOT NULL
+            GROUP BY address_text
+        """)
+        return AddressIndex.build([*((o, 0) for o in OPS),
+                                   *((r["address_text"], r["seen"], r["lat"], r["lon"]) for r in rows)])
+
+    async def apply(self, conn, ch: dict):
+        if ch["reset"]:
+            self.index = await self._build(conn)
+            self.max_id = max((r["id"] for r in ch["upserts"]), default=self.max_id)
+            return
+        for r in ch["upserts"]:
+            # ids only grow, so a known id is an edit of an incident already counted
+            new = r["id"] > self.max_id
+            self.index.add(r["address_text"], 1 if new else 0, r["lat"], r["lon"])
+            self.max_id = max(self.max_id, r["id"])
+
+incident_addresses = IncidentAddresses()
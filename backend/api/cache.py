@@ -0,0 +1,145 @@
+# backend/api/cache.py
+import asyncio, gzip, hashlib, json, os, time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+# safety net only; entries are normally dropped by the scraper's NOTIFY
+CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "900"))
+COMPRESS_MIN_BYTES = 1024
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+@dataclass
+class Entry:
+    body: bytes
+    etag: str
+    headers: dict = field(default_factory=dict)
+    gzip: bytes | None = None
+    br: bytes | None = None
+    created: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def build(cls, data, headers: dict | None = None) -> "Entry":
+        body = dumps(data)
+        # strong ETag from the bytes: identical across workers/replicas for identical data
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        e = cls(body=body, etag=etag, headers=headers or {})
+        if len(body) >= COMPRESS_MIN_BYTES:
+            e.gzip = gzip.compress(body, compresslevel=6, mtime=0)
+            if brotli is not None:
+                e.br = brotli.compress(body, quality=5)
+        return e
+
+    def etag_for(self, encoding: str | None) -> str:
+        """Each body gets its own strong ETag ('"<hash>-br"'): the br, gzip and identity bytes differ."""
+        return self.etag if not encoding else f'{self.etag[:-1]}-{encoding}"'
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(t.strip().removeprefix("W/") == etag for t in header.split(","))
+
+class ResponseCache:
+    """
+    In-process cache of encoded JSON responses keyed by path + query string.
+    invalidate() is wired to the incident_changes NOTIFY, so readers never see
+    data older than the last committed scrape (bar CACHE_TTL_SECONDS if a
+    notification is missed).
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, Entry] = OrderedDict()
+        self._building: dict[str, asyncio.Future] = {}
+        self.generation = 0
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0}
+
+    @staticmethod
+    def key(request: Request) -> str:
+        return request.url.path + "?" + "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+
+    def invalidate(self, _payload: str | None = None):
+        self.generation += 1
+        self._entries.clear()
+        self.stats["invalidations"] += 1
+
+    def _get(self, key: str) -> Entry | None:
+        e = self._entries.get(key)
+        if e is None:
+            return None
+        if time.monotonic() - e.created > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return e
+
+    async def get_or_build(self, key: str, build) -> Entry:
+        """build() -> (data, extra_headers). Concurrent misses for one key share a single build."""
+        e = self._get(key)
+        if e is not None:
+            self.stats["hits"] += 1
+            return e
+        pending = self._building.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        self.stats["misses"] += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._building[key] = fut
+        gen = self.generation
+        try:
+            data, headers = await build()
+            e = Entry.build(data, headers)
+            # an invalidation during the build means the data may already be stale
+            if gen == self.generation:
+                self._entries[key] = e
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            fut.set_result(e)
+            return e
+        except BaseException as exc:
+            fut.set_exception(exc)
+            fut.exception()  # mark retrieved when nobody is waiting
+            raise
+        finally:
+            self._building.pop(key, None)
+
+    def respond(self, entry: Entry, request: Request) -> Response:
+        accept = request.headers.get("accept-encoding", "")
+        body, encoding = entry.body, None
+        if entry.br is not None and "br" in accept:
+            body, encoding = entry.br, "br"
+        elif entry.gzip is not None and "gzip" in accept:
+            body, encoding = entry.gzip, "gzip"
+        headers = {
+            "ETag": entry.etag_for(encoding),
+            "Cache-Control": "no-cache",   # always revalidate; revalidation is a 304
+            "Vary": "Accept-Encoding",
+            **entry.headers,
+        }
+        if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+response_cache = ResponseCache()
@@ -0,0 +1,66 @@
+# backend/api/changefeed.py
+import asyncio, logging
+
+from api import db
+from api.incidents import fetch_changes
+
+class ChangeLogFollower:
+    """
+    In-process view of the incident table kept in step through the change log
+    (geo.IncidentIndex, addresses.IncidentAddresses). mark_dirty is the
+    incident_changes broadcaster callback and refreshes in the background;
+    ensure_fresh returns `self.index` once it reflects every NOTIFY seen so far,
+    so a request arriving mid-refresh waits for it rather than reading (and
+    response_cache storing) the view from before the scrape.
+
+    Subclasses set `name`, `fields` (columns fetch_changes returns) and
+    `self.index`, and implement apply().
+    """
+
+    name = "changes"
+    fields: tuple[str, ...] = ("id",)
+
+    def __init__(self):
+        self.index = None
+        self.cursor = 0
+        self.marked = 1      # NOTIFYs seen; the first use counts as one
+        self.applied = 0     # value of `marked` that `index` reflects
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def dirty(self) -> bool:
+        return self.applied < self.marked
+
+    async def apply(self, conn, ch: dict):
+        """Fold one fetch_changes result into self.index; `conn` is still open for extra reads."""
+        raise NotImplementedError
+
+    def mark_dirty(self, _payload: str | None = None):
+        """broadcaster callback: refresh in the background so the next request is already current."""
+        self.marked += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._refresh_quietly())
+
+    async def _refresh_quietly(self):
+        try:
+            await self.ensure_fresh()
+        except Exception:
+            pass   # logged in ensure_fresh; the next request retries
+
+    async def ensure_fresh(self):
+        while self.dirty:
+            async with self._lock:
+                target = self.marked
+                if self.applied >= target:
+                    break
+                try:
+                    async with db.acquire() as conn:
+                        ch = await fetch_changes(conn, self.cursor, list(self.fields))
+                        await self.apply(conn, ch)
+                except Exception as e:
+                    logging.warning(f"[{self.name}] refresh failed: {e}")
+                    raise
+                self.cursor = int(ch["cursor"])
+                self.applied = target
+        return self.index
@@ -0,0 +1,99 @@
+# backend/api/db.py
+import os, time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import asyncpg
+
+from api import metrics
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "200"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "10"))
+
+class Timings:
+    """Rolling window of durations (seconds) with cheap percentiles for /__debug/db."""
+
+    def __init__(self, window: int = 2048):
+        self.samples: deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self) -> dict:
+        s = sorted(self.samples)
+        pick = lambda q: round(s[min(len(s) - 1, int(q * len(s)))] * 1000, 3) if s else None
+        return {"count": self.count, "p50_ms": pick(0.50), "p99_ms": pick(0.99), "max_ms": pick(1.0)}
+
+pool_wait = Timings()
+query_time = Timings()
+
+_pool: asyncpg.Pool | None = None
+
+def _log_query(q):
+    query_time.add(q.elapsed)
+    metrics.DB_QUERY_SECONDS.observe(q.elapsed)
+
+async def _init_conn(conn: asyncpg.Connection):
+    conn.add_query_logger(_log_query)
+
+async def open_pool(dsn: str) -> asyncpg.Pool:
+    global _pool
+    _pool = await asyncpg.create_pool(
+        dsn,
+        min_size=DB_POOL_MIN,
+        max_size=DB_POOL_MAX,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        command_timeout=DB_COMMAND_TIMEOUT,
+        init=_init_conn,
+    )
+    return _pool
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+def get_pool() -> asyncpg.Pool:
+    if _pool is None:
+        raise RuntimeError("DB pool is not open (lifespan not started)")
+    return _pool
+
+@asynccontextmanager
+async def acquire() -> AsyncIterator[asyncpg.Connection]:
+    """Pooled connection, with the time spent waiting for it recorded in pool_wait."""
+    pool = get_pool()
+    t0 = time.perf_counter()
+    async with pool.acquire() as conn:
+        waited = time.perf_counter() - t0
+        pool_wait.add(waited)
+        metrics.DB_POOL_WAIT.observe(waited)
+        yield conn
+
+async def get_conn() -> AsyncIterator[asyncpg.Connection]:
+    """FastAPI dependency: a pooled connection for the duration of the request."""
+    async with acquire() as conn:
+        yield conn
+
+metrics.DB_POOL_CONNECTIONS.labels("open").set_function(lambda: _pool.get_size() if _pool else 0)
+metrics.DB_POOL_CONNECTIONS.labels("idle").set_function(lambda: _pool.get_idle_size() if _pool else 0)
+
+def stats() -> dict:
+    pool = _pool
+    return {
+        "pool": {
+            "size": pool.get_size() if pool else 0,
+            "idle": pool.get_idle_size() if pool else 0,
+            "min": DB_POOL_MIN,
+            "max": DB_POOL_MAX,
+        },
+        "pool_wait": pool_wait.summary(),
+        "query_time": query_time.summary(),
+    }
@@ -0,0 +1,204 @@
+# backend/api/geo.py
+import importlib.util, math, os
+from dataclasses import dataclass, field
+
+from api.changefeed import ChangeLogFollower
+
+# a cluster covers about CLUSTER_RADIUS_PX screen pixels on CLUSTER_EXTENT-pixel map tiles
+CLUSTER_RADIUS_PX = float(os.getenv("CLUSTER_RADIUS_PX", "60"))
+CLUSTER_EXTENT = int(os.getenv("CLUSTER_EXTENT", "256"))
+# above this zoom every incident is its own feature
+CLUSTER_MAX_ZOOM = int(os.getenv("CLUSTER_MAX_ZOOM", "16"))
+MVT_EXTENT = 4096
+# optional; imported on the first tile request, since it pulls in shapely and numpy
+HAS_MVT = importlib.util.find_spec("mapbox_vector_tile") is not None
+MVT_LAYER = "incidents"
+
+POINT_FIELDS = ("id", "lat", "lon", "status", "address_text", "description")
+
+def mercator(lon: float, lat: float) -> tuple[float, float]:
+    """lon/lat -> Web Mercator normalised to [0, 1] (y grows southwards, as in tile coordinates)."""
+    s = min(max(math.sin(math.radians(lat)), -0.9999), 0.9999)
+    return (lon + 180.0) / 360.0, 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+
+def unmercator(x: float, y: float) -> tuple[float, float]:
+    lon = x * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lon, lat
+
+@dataclass
+class Cell:
+    count: int = 0
+    sx: float = 0.0
+    sy: float = 0.0
+    ids: set = field(default_factory=set)
+
+@dataclass
+class Point:
+    x: float
+    y: float
+    lon: float
+    lat: float
+    props: dict
+
+class ClusterIndex:
+    """
+    Hierarchical grid clustering (supercluster-style output, quadtree cells instead
+    of a KD-tree): at zoom z a cell spans CLUSTER_RADIUS_PX / CLUSTER_EXTENT of a
+    tile, so the cells of zoom z+1 nest exactly 2x2 inside those of zoom z.
+    Adding or removing a point touches one cell per zoom level, which is what lets
+    the index follow the incident change log instead of being rebuilt.
+    """
+
+    def __init__(self, max_zoom: int = CLUSTER_MAX_ZOOM, radius_px: float = CLUSTER_RADIUS_PX,
+                 extent: int = CLUSTER_EXTENT):
+        self.max_zoom = max_zoom
+        self.cell0 = radius_px / extent          # cell size at zoom 0, in normalised mercator units
+        self.points: dict[int, Point] = {}
+        self.levels: list[dict[tuple[int, int], Cell]] = [{} for _ in range(max_zoom + 1)]
+
+    def _key(self, x: float, y: float, z: int) -> tuple[int, int]:
+        scale = (1 << z) / self.cell0
+        return int(x * scale), int(y * scale)
+
+    # ---- maintenance ----
+    def add(self, id_: int, lon: float, lat: float, props: dict):
+        if id_ in self.points:
+            self.remove(id_)
+        x, y = mercator(lon, lat)
+        self.points[id_] = Point(x, y, lon, lat, props)
+        for z, level in enumerate(self.levels):
+            cell = level.get(self._key(x, y, z))
+            if cell is None:
+                cell = level[self._key(x, y, z)] = Cell()
+            cell.count += 1
+            cell.sx += x
+            cell.sy += y
+            cell.ids.add(id_)
+
+    def remove(self, id_: int):
+        p = self.points.pop(id_, None)
+        if p is None:
+            return
+        for z, level in enumerate(self.levels):
+            key = self._key(p.x, p.y, z)
+            cell = level[key]
+            cell.count -= 1
+            cell.ids.discard(id_)
+            if cell.count == 0:
+                del level[key]
+            else:
+                cell.sx -= p.x
+                cell.sy -= p.y
+
+    def apply(self, rows: list[dict], deleted: list[int] = ()):
+        for r in rows:
+            if r.get("lat") is None or r.get("lon") is None:
+                self.remove(r["id"])
+            else:
+                self.add(r["id"], float(r["lon"]), float(r["lat"]),
+                         {k: r[k] for k in POINT_FIELDS if k not in ("lat", "lon") and r.get(k) is not None})
+        for id_ in deleted:
+            self.remove(id_)
+
+    def reset(self, rows: list[dict]):
+        self.points.clear()
+        self.levels = [{} for _ in range(self.max_zoom + 1)]
+        self.apply(rows)
+
+    # ---- queries ----
+    def _cells_in(self, z: int, x0: float, y0: float, x1: float, y1: float):
+        level = self.levels[z]
+        (cx0, cy0), (cx1, cy1) = self._key(x0, y0, z), self._key(x1, y1, z)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(level):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    cell = level.get((cx, cy))
+                    if cell is not None:
+                        yield (cx, cy), cell
+        else:
+            for (cx, cy), cell in level.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    yield (cx, cy), cell
+
+    def expansion_zoom(self, z: int, key: tuple[int, int]) -> int:
+        """First zoom at which the cluster's members fall into more than one cell."""
+        cx, cy = key
+        for zz in range(z + 1, self.max_zoom + 1):
+            level = self.levels[zz]
+            children = [(cx * 2 + i, cy * 2 + j) for i in (0, 1) for j in (0, 1) if (cx * 2 + i, cy * 2 + j) in level]
+            if len(children) != 1:
+                return zz
+            cx, cy = children[0]
+        return self.max_zoom + 1
+
+    def features(self, z: int, x0: float, y0: float, x1: float, y1: float) -> list[tuple[float, float, int | str, dict]]:
+        """(mercator x, y, feature id, properties) for the normalised box at zoom z."""
+        out = []
+        if z > self.max_zoom:
+            for id_, p in self.points.items():
+                if x0 <= p.x <= x1 and y0 <= p.y <= y1:
+                    out.append((p.x, p.y, id_, p.props))
+            return out
+        for key, cell in self._cells_in(z, x0, y0, x1, y1):
+            if cell.count == 1:
+                p = self.points[next(iter(cell.ids))]
+                out.append((p.x, p.y, p.props["id"], p.props))
+            else:
+                cid = f"{z}/{key[0]}/{key[1]}"
+                out.append((cell.sx / cell.count, cell.sy / cell.count, cid, {
+                    "cluster": True, "cluster_id": cid, "point_count": cell.count,
+                    "expansion_zoom": self.expansion_zoom(z, key),
+                }))
+        return out
+
+    def geojson(self, bbox: tuple[float, float, float, float] | None, zoom: int | None) -> dict:
+        min_lon, min_lat, max_lon, max_lat = bbox or (-180.0, -85.0, 180.0, 85.0)
+        x0, y1 = mercator(min_lon, min_lat)
+        x1, y0 = mercator(max_lon, max_lat)
+        z = self.max_zoom + 1 if zoom is None else max(0, zoom)
+        feats = []
+        for x, y, fid, props in self.features(z, x0, y0, x1, y1):
+            lon, lat = unmercator(x, y)
+            feats.append({"type": "Feature", "id": fid,
+                          "geometry": {"type": "Point", "coordinates": [round(lon, 6), round(lat, 6)]},
+                          "properties": props})
+        return {"type": "FeatureCollection", "features": feats}
+
+    def tile(self, z: int, x: int, y: int) -> bytes:
+        """Mapbox vector tile with one point layer (clusters and single incidents)."""
+        import mapbox_vector_tile
+        n = 1 << z
+        feats = []
+        for fx, fy, fid, props in self.features(z, x / n, y / n, (x + 1) / n, (y + 1) / n):
+            px = (fx * n - x) * MVT_EXTENT
+            py = (fy * n - y) * MVT_EXTENT
+            feats.append({"geometry": f"POINT ({px:.1f} {py:.1f})",
+                          "properties": {k: v for k, v in props.items() if v is not None},
+                          **({"id": fid} if isinstance(fid, int) else {})})
+        return mapbox_vector_tile.encode(
+            [{"name": MVT_LAYER, "features": feats}],
+            default_options={"extents": MVT_EXTENT, "y_coord_down": True, "quantize_bounds": None},
+        )
+
+class IncidentIndex(ChangeLogFollower):
+    """
+    ClusterIndex kept in step with the incident table through the change log:
+    the first use loads every located incident, after that each incident_changes
+    NOTIFY applies only the rows changed since the last cursor.
+    """
+
+    name = "geo"
+    fields = POINT_FIELDS
+
+    def __init__(self):
+        super().__init__()
+        self.index = ClusterIndex()
+
+    async def apply(self, conn, ch: dict):
+        if ch["reset"]:
+            self.index.reset(ch["upserts"])
+        else:
+            self.index.apply(ch["upserts"], ch["deleted"])
+
+incident_index = IncidentIndex()
@@ -0,0 +1,154 @@
+# backend/api/incidents.py
+import base64
+from datetime import date, datetime
+from fastapi import HTTPException
+
+# columns GET /incidents may return; dedupe_hash / seen / lan are internal
+PUBLIC_FIELDS = (
+    "id", "source", "source_url", "title", "description", "address_text", "status",
+    "starts_at", "ends_at", "created_at", "updated_at", "lat", "lon",
+)
+MAX_LIMIT = 1000
+
+def parse_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return list(PUBLIC_FIELDS)
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in PUBLIC_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return wanted
+
+def parse_bbox(bbox: str | None) -> tuple[float, float, float, float] | None:
+    """'minLon,minLat,maxLon,maxLat' (same order as the Nominatim viewbox in the frontend)."""
+    if not bbox:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(x) for x in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox min must be <= max")
+    return min_lon, min_lat, max_lon, max_lat
+
+def encode_cursor(created_at: datetime, id_: int) -> str:
+    raw = f"{created_at.isoformat()}|{id_}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, id_ = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(id_)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def build_query(fields: list[str], status: str | None, bbox, has_coords: bool | None,
+                cursor: str | None, limit: int) -> tuple[str, list]:
+    """
+    SELECT for one keyset page; always selects created_at/id so the caller can
+    build the next cursor, whether or not they were asked for.
+    """
+    cols = list(dict.fromkeys([*fields, "created_at", "id"]))
+    where, args = [], []
+
+    def arg(v) -> str:
+        args.append(v)
+        return f"${len(args)}"
+
+    if status:
+        where.append(f"status = {arg(status)}")
+    if bbox:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        where.append(f"lat BETWEEN {arg(min_lat)} AND {arg(max_lat)}")
+        where.append(f"lon BETWEEN {arg(min_lon)} AND {arg(max_lon)}")
+    if bbox or has_coords:
+        where.append("lat IS NOT NULL AND lon IS NOT NULL")
+    elif has_coords is False:
+        where.append("(lat IS NULL OR lon IS NULL)")
+    if cursor:
+        c_at, c_id = decode_cursor(cursor)
+        where.append(f"(created_at, id) < ({arg(c_at)}, {arg(c_id)})")
+
+    sql = f"SELECT {', '.join(cols)} FROM incident"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY created_at DESC, id DESC LIMIT {arg(min(max(limit, 1), MAX_LIMIT))}"
+    return sql, args
+
+async def fetch_changes(conn, since: int, cols: list[str]) -> dict:
+    """
+    Rows inserted/updated and ids deleted by transactions at or after cursor `since`.
+    The cursor is the snapshot xmin (incident_change_head()): every transaction
+    below it has finished, so a slow writer is picked up by the next call instead
+    of being skipped. reset=True means `since` is 0, ahead of the head or older
+    than the retained log: the client should drop its cache and apply `upserts`
+    as a full snapshot.
+    """
+    async with conn.transaction(isolation="repeatable_read", readonly=True):
+        head = await conn.fetchval("SELECT incident_change_head()")
+        pruned = await conn.fetchval("SELECT xid::text::bigint FROM incident_change_pruned")
+        reset = since <= 0 or since > head or (pruned is not None and since <= pruned)
+
+        col_sql = ", ".join(dict.fromkeys([*cols, "id"]))
+        if reset:
+            rows = await conn.fetch(f"SELECT {col_sql} FROM incident ORDER BY id")
+            return {"cursor": str(head), "reset": True, "upserts": [{f: r[f] for f in cols} for r in rows], "deleted": []}
+
+        latest = await conn.fetch("""
+            SELECT DISTINCT ON (incident_id) incident_id, op
+            FROM incident_change
+            WHERE xid >= $1::text::xid8 AND xid < $2::text::xid8
+            ORDER BY incident_id, seq DESC
+        """, str(since), str(head))
+        upsert_ids = [r["incident_id"] for r in latest if r["op"] == "upsert"]
+        deleted = [r["incident_id"] for r in latest if r["op"] == "delete"]
+        rows = await conn.fetch(f"SELECT {col_sql} FROM incident WHERE id = ANY($1::bigint[]) ORDER BY id", upsert_ids) if upsert_ids else []
+    return {"cursor": str(head), "reset": False, "upserts": [{f: r[f] for f in cols} for r in rows], "deleted": deleted}
+
+# GET /incidents/history/stats may group by any of these
+HISTORY_GROUPS = ("day", "opstina", "source")
+
+def parse_group_by(group_by: str | None) -> list[str]:
+    wanted = [g.strip() for g in (group_by or "day,opstina").split(",") if g.strip()]
+    unknown = [g for g in wanted if g not in HISTORY_GROUPS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by: {', '.join(unknown)}")
+    return list(dict.fromkeys(wanted))
+
+async def history_stats(conn, groups: list[str], date_from: date | None, date_to: date | None,
+                        opstina: str | None, source: str | None) -> list[dict]:
+    """
+    Resolved outages and their mean duration (minutes) from incident_daily_stats;
+    never reads incident or incident_history. opstina '' = unknown municipality.
+    """
+    from worker.parser import OPS_BY_KEY
+    from worker.textnorm import normalize_key
+
+    where, args = [], []
+
+    def arg(v) -> str:
+        args.append(v)
+        return f"${len(args)}"
+
+    if date_from:
+        where.append(f"day >= {arg(date_from)}")
+    if date_to:
+        where.append(f"day <= {arg(date_to)}")
+    if opstina is not None:
+        where.append(f"opstina = {arg(OPS_BY_KEY.get(normalize_key(opstina), opstina))}")
+    if source:
+        where.append(f"source = {arg(source)}")
+
+    sql = f"""
+        SELECT {''.join(g + ', ' for g in groups)}sum(resolved)::int AS resolved,
+               sum(duration_seconds) / nullif(sum(resolved), 0) / 60 AS mean_minutes
+        FROM incident_daily_stats
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if groups:
+        sql += f" GROUP BY {', '.join(groups)} ORDER BY {', '.join(groups)}"
+    rows = await conn.fetch(sql, *args)
+    return [{**{g: r[g] for g in groups}, "resolved": r["resolved"],
+             "mean_minutes": None if r["mean_minutes"] is None else round(r["mean_minutes"], 1)} for r in rows]
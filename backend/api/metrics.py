@@ -0,0 +1,62 @@
+# backend/api/metrics.py
+import time
+
+from fastapi import Response
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+except Exception:
+    generate_latest = None
+
+from worker.metrics import Gauge, Histogram, metric
+
+# long-lived streams would only flatten the latency histograms
+SKIP_PATHS = {"/metrics", "/incidents/stream"}
+
+HTTP_SECONDS = metric(Histogram, "h2o_http_request_seconds", "API request latency by route template",
+                      ["method", "route", "status"],
+                      buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+HTTP_RESPONSE_BYTES = metric(Histogram, "h2o_http_response_bytes", "Response body bytes as sent (after compression)",
+                             ["route"], buckets=(128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+DB_POOL_WAIT = metric(Histogram, "h2o_db_pool_wait_seconds", "Time spent waiting for a pooled asyncpg connection",
+                      buckets=(.0001, .0005, .001, .005, .01, .025, .05, .1, .25, .5, 1, 5))
+DB_QUERY_SECONDS = metric(Histogram, "h2o_db_query_seconds", "asyncpg query execution time",
+                          buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 5))
+DB_POOL_CONNECTIONS = metric(Gauge, "h2o_db_pool_connections", "asyncpg pool connections", ["state"])
+SSE_CLIENTS = metric(Gauge, "h2o_sse_clients", "Connected /incidents/stream clients")
+
+class MetricsMiddleware:
+    """Pure ASGI (streams pass straight through): latency and body size per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in SKIP_PATHS:
+            return await self.app(scope, receive, send)
+
+        t0 = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # templates, not raw paths, keep label cardinality bounded
+            name = getattr(route, "path", None) or "unmatched"
+            HTTP_SECONDS.labels(scope["method"], name, str(status)).observe(time.perf_counter() - t0)
+            HTTP_RESPONSE_BYTES.labels(name).observe(size)
+
+def metrics_response() -> Response:
+    if generate_latest is None:
+        return Response("prometheus_client not installed\n", status_code=503, media_type="text/plain")
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,57 @@
+# backend/api/passwords.py
+import asyncio, os
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# cost factor for new hashes; stored hashes with another cost are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so threads hash in parallel without blocking the event loop
+BCRYPT_MAX_WORKERS = int(os.getenv("BCRYPT_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+# hashes waiting for a worker beyond this are refused (503) instead of queueing for seconds
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", str(8 * BCRYPT_MAX_WORKERS)))
+
+class PasswordBusy(Exception):
+    """Too many hashes queued; the caller should answer 503 + Retry-After."""
+
+_executor = ThreadPoolExecutor(max_workers=BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+
+async def _run(fn, *args):
+    global _pending
+    if _pending >= BCRYPT_MAX_WORKERS + BCRYPT_MAX_PENDING:
+        raise PasswordBusy()
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _pending -= 1
+
+def _checkpw(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode(), hashed.encode())
+    except ValueError:
+        # malformed / non-bcrypt hash in the row
+        return False
+
+def _hashpw(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+async def hash_password(password: str, rounds: int | None = None) -> str:
+    return await _run(_hashpw, password, rounds or BCRYPT_ROUNDS)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await _run(_checkpw, password, hashed)
+
+def cost_of(hashed: str) -> int | None:
+    """'$2b$12$...' -> 12"""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed: str) -> bool:
+    return cost_of(hashed) != BCRYPT_ROUNDS
+
+def stats() -> dict:
+    return {"rounds": BCRYPT_ROUNDS, "workers": BCRYPT_MAX_WORKERS, "in_flight": _pending}
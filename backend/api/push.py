@@ -0,0 +1,133 @@
+# backend/api/push.py
+import asyncio, json, logging, os
+
+import asyncpg
+
+from api import metrics
+
+CHANNEL = "incident_changes"
+PUSH_MAX_CLIENTS = int(os.getenv("PUSH_MAX_CLIENTS", "20000"))
+PUSH_KEEPALIVE_SECONDS = float(os.getenv("PUSH_KEEPALIVE_SECONDS", "20"))
+PUSH_RECONNECT_SECONDS = float(os.getenv("PUSH_RECONNECT_SECONDS", "5"))
+
+class Subscriber:
+    """
+    One connected client. Holds only the newest cursor plus a wake-up event, so a
+    slow reader never queues anything: it skips intermediate cursors and catches
+    up through /incidents/changes?since=<its last cursor>.
+    """
+
+    __slots__ = ("latest", "event")
+
+    def __init__(self):
+        self.latest: str | None = None
+        self.event = asyncio.Event()
+
+    def push(self, cursor: str):
+        self.latest = cursor
+        self.event.set()
+
+    async def next(self, timeout: float) -> str | None:
+        """Newest cursor, or None on timeout (caller sends a keepalive)."""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.event.clear()
+        return self.latest
+
+class Broadcaster:
+    """
+    Single LISTEN connection fanned out to every SSE client in this process.
+    Idle clients cost an Event each and no database work at all.
+    """
+
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self.subscribers: set[Subscriber] = set()
+        self.callbacks: list = []      # sync fn(payload) run on every notification (cache invalidation etc.)
+        self.notifications = 0
+        self._dsn: str | None = None
+        self._conn: asyncpg.Connection | None = None
+        self._reconnect: asyncio.Task | None = None
+        self._closing = False
+
+    # ---- LISTEN side ----
+    async def start(self, dsn: str):
+        self._dsn = dsn
+        self._closing = False
+        await self._listen()
+
+    async def _listen(self):
+        self._conn = await asyncpg.connect(self._dsn)
+        self._conn.add_termination_listener(self._on_terminate)
+        await self._conn.add_listener(self.channel, self._on_notify)
+
+    def _on_terminate(self, _conn):
+        if self._closing:
+            return
+        logging.warning("[push] listener connection lost, reconnecting")
+        self._reconnect = asyncio.get_running_loop().create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        while not self._closing:
+            await asyncio.sleep(PUSH_RECONNECT_SECONDS)
+            try:
+                await self._listen()
+            except Exception as e:
+                logging.warning(f"[push] reconnect failed: {e}")
+                continue
+            # anything may have changed while we were deaf
+            self.publish("")
+            return
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str):
+        self.publish(payload)
+
+    def publish(self, payload: str):
+        self.notifications += 1
+        for cb in self.callbacks:
+            try:
+                cb(payload)
+            except Exception as e:
+                logging.warning(f"[push] callback failed: {e}")
+        for sub in self.subscribers:
+            sub.push(payload)
+
+    async def stop(self):
+        self._closing = True
+        if self._reconnect:
+            self._reconnect.cancel()
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    # ---- client side ----
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber()
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        self.subscribers.discard(sub)
+
+    def full(self) -> bool:
+        return len(self.subscribers) >= PUSH_MAX_CLIENTS
+
+broadcaster = Broadcaster()
+metrics.SSE_CLIENTS.set_function(lambda: len(broadcaster.subscribers))
+
+async def sse_events(sub: Subscriber, is_disconnected, keepalive: float = PUSH_KEEPALIVE_SECONDS):
+    """text/event-stream body: one 'incidents' event per change notification."""
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            cursor = await sub.next(keepalive)
+            if await is_disconnected():
+                break
+            if cursor is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: incidents\ndata: {json.dumps({'cursor': cursor})}\n\n"
+    finally:
+        broadcaster.unsubscribe(sub)
@@ -0,0 +1,117 @@
+# backend/bench/leader_failover.py
+#   cd backend && BENCH_DATABASE_URL=postgresql://.../h2o_bench python -m bench.leader_failover \
+#       [--lease-seconds 3] [--renew-seconds 0.5]
+# Two worker.leader.Leases replicas on one unit against a throwaway Postgres
+# (migrations applied; rows of source 'bench-failover' are written and removed):
+#   1. the leader stalls (its renew loop stops) while a write of its run is in
+#      flight; it still believes it leads
+#   2. Postgres ends the silent lock session after --lease-seconds; the other
+#      replica locks the unit but must not lead until that write ends
+#   3. the stalled replica's next write, with its old fence token, is refused
+#      (dbio.LeaseLost) while the new leader's write goes through
+# Prints the timeline and the failover time; exits 1 when any step misbehaves.
+import argparse, asyncio, os, sys, time
+
+SOURCE = "bench-failover"
+UNIT = f"source:{SOURCE}"
+
+def row(title: str) -> dict:
+    return {"title": title, "description": "bench", "address_text": "Устаничка 1", "lat": None, "lon": None}
+
+async def wait_for(cond, timeout: float, step: float = 0.05) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        await asyncio.sleep(step)
+    return cond()
+
+async def scenario(args) -> list[str]:
+    import psycopg
+    from worker import dbio
+    from worker.leader import Leases
+
+    problems = []
+    t0 = time.monotonic()
+    def log(msg: str):
+        print(f"{time.monotonic() - t0:7.2f}s  {msg}")
+
+    replicas = {"A": Leases([UNIT]), "B": Leases([UNIT])}
+    for r in replicas.values():
+        await r.start(args.dsn)
+    if not await wait_for(lambda: sum(r.holds(UNIT) for r in replicas.values()) == 1, 5 * args.renew_seconds):
+        return ["no single leader after the first elections"]
+    old_name = next(n for n, r in replicas.items() if r.holds(UNIT))
+    old, new = replicas[old_name], replicas["B" if old_name == "A" else "A"]
+    log(f"{old_name} leads {UNIT}")
+
+    # 1. the leader stalls mid-run: no more renewals, but it still thinks it leads
+    token = old.fence(UNIT)
+    old._task.cancel()
+    conn = await asyncio.to_thread(psycopg.connect, args.dsn)
+    cur = conn.cursor()
+    await asyncio.to_thread(dbio.check_fence, cur, token)
+    await asyncio.to_thread(cur.execute, "SELECT 1")
+    log(f"{old_name} stalled with a write in flight (fence {token})")
+
+    # 2. its lock session times out; the other replica locks the unit but waits for the fence
+    t_stall = time.monotonic()
+    takeover = args.lease_seconds + 4 * args.renew_seconds
+    if not await wait_for(lambda: UNIT in new.fencing or new.holds(UNIT), takeover):
+        problems.append(f"unit not taken over within {takeover:.1f}s")
+    log(f"lock session of {old_name} gone; {'waiting on the fence' if UNIT in new.fencing else 'leading'}")
+    await asyncio.sleep(3 * args.renew_seconds)
+    if new.holds(UNIT):
+        problems.append("new leader started while the old leader's write was in flight")
+    await asyncio.to_thread(conn.commit)
+    conn.close()
+    log(f"in-flight write of {old_name} committed")
+    if not await wait_for(lambda: new.holds(UNIT), 3 * args.renew_seconds):
+        problems.append("new leader did not start after the fence was released")
+    failover = time.monotonic() - t_stall
+    log(f"new leader running, failover {failover:.2f}s (lease {args.lease_seconds}s)")
+
+    # 3. split brain: both replicas write; only the current leader's write lands
+    try:
+        await asyncio.to_thread(dbio.apply_source_diff, SOURCE, "bench", [row("stale")], [], token)
+        problems.append("stale leader's write was accepted")
+        log(f"{old_name} wrote with a stale fence")
+    except dbio.LeaseLost as e:
+        log(f"{old_name} refused: {e}")
+    inserted, _, _ = await asyncio.to_thread(
+        dbio.apply_source_diff, SOURCE, "bench", [row("current")], [], new.fence(UNIT))
+    if len(inserted) != 1:
+        problems.append(f"current leader's write inserted {len(inserted)} rows")
+    log(f"new leader wrote {len(inserted)} row(s)")
+
+    with psycopg.connect(args.dsn) as c:
+        titles = sorted(t for (t,) in c.execute("SELECT title FROM incident WHERE source = %s", (SOURCE,)))
+        c.execute("DELETE FROM incident WHERE source = %s", (SOURCE,))
+    if titles != ["current"]:
+        problems.append(f"incident rows of {SOURCE}: {titles}")
+    for r in replicas.values():
+        await r.stop()
+    return problems
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dsn", default=os.getenv("BENCH_DATABASE_URL"))
+    ap.add_argument("--lease-seconds", type=float, default=3)
+    ap.add_argument("--renew-seconds", type=float, default=0.5)
+    args = ap.parse_args()
+    if not args.dsn:
+        ap.error("set BENCH_DATABASE_URL or --dsn (never the production database)")
+
+    # before the worker modules read their settings at import time
+    os.environ.update({"DATABASE_URL": args.dsn,
+                       "LEADER_LEASE_SECONDS": str(args.lease_seconds),
+                       "LEADER_RENEW_SECONDS": str(args.renew_seconds)})
+
+    problems = asyncio.run(scenario(args))
+    for p in problems:
+        print(f"FAIL {p}")
+    print("ok" if not problems else f"{len(problems)} problem(s)")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
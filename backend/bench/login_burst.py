@@ -0,0 +1,118 @@
+# backend/bench/login_burst.py
+#   cd backend && BENCH_DATABASE_URL=... python -m bench.login_burst [--rate 200] [--seconds 3] [--rounds 10]
+# Fires a login burst at the API in-process (httpx ASGITransport, same event loop
+# as a real uvicorn worker) while a prober keeps calling /incidents, once with
+# bcrypt run inline in the handler (the old behaviour) and once through
+# api.passwords' bounded thread pool, and prints /incidents latency before and
+# during each burst. Creates and removes one user in the given database.
+import argparse, asyncio, os, statistics, time
+
+BENCH_EMAIL = "login-burst@example.com"
+PASSWORD = "correct horse battery staple"
+
+def pct(xs: list[float], q: float) -> float:
+    if not xs:
+        return float("nan")
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))] * 1000
+
+async def probe(client, stop: asyncio.Event, interval: float) -> list[float]:
+    """Latency from when each probe *should* have started, so time the loop spent stalled counts."""
+    lat = []
+    due = time.perf_counter()
+    while not stop.is_set():
+        r = await client.get("/incidents", params={"limit": 50})
+        r.raise_for_status()
+        done = time.perf_counter()
+        lat.append(done - due)
+        due = done + interval
+        await asyncio.sleep(interval)
+    return lat
+
+async def login(client) -> tuple[int, float]:
+    t0 = time.perf_counter()
+    r = await client.post("/login", json={"email": BENCH_EMAIL, "password": PASSWORD})
+    return r.status_code, time.perf_counter() - t0
+
+async def burst(client, rate: float, seconds: float) -> list[tuple[int, float]]:
+    loop = asyncio.get_running_loop()
+    tasks, t0, i = [], loop.time(), 0
+    while loop.time() - t0 < seconds:
+        target = t0 + i / rate
+        now = loop.time()
+        if now < target:
+            await asyncio.sleep(target - now)
+            continue
+        tasks.append(asyncio.create_task(login(client)))
+        i += 1
+    return await asyncio.gather(*tasks)
+
+async def run_mode(client, mode: str, args):
+    from api import passwords
+
+    if mode == "inline":
+        async def _run(fn, *a):
+            return fn(*a)
+        saved, passwords._run = passwords._run, _run
+    try:
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, stop, args.probe_interval))
+        await asyncio.sleep(1.0)
+        stop.set()
+        idle = await prober
+
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, stop, args.probe_interval))
+        t0 = time.perf_counter()
+        results = await burst(client, args.rate, args.seconds)
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        busy = await prober
+    finally:
+        if mode == "inline":
+            passwords._run = saved
+
+    ok = [t for s, t in results if s == 200]
+    shed = sum(1 for s, _ in results if s == 503)
+    other = len(results) - len(ok) - shed
+    print(f"{mode:>6}: logins sent={len(results)} ok={len(ok)} 503={shed} other={other} "
+          f"in {elapsed:.1f}s, login p50={pct(ok, .5):.0f}ms p99={pct(ok, .99):.0f}ms")
+    print(f"        /incidents idle p50={pct(idle, .5):.1f}ms p99={pct(idle, .99):.1f}ms | "
+          f"during burst p50={pct(busy, .5):.1f}ms p99={pct(busy, .99):.1f}ms max={pct(busy, 1):.0f}ms "
+          f"(n={len(busy)}, mean={statistics.fmean(busy) * 1000 if busy else float('nan'):.1f}ms)")
+
+async def main_async(args):
+    import httpx
+    from api import db, main, passwords
+
+    pool = await db.open_pool(args.dsn)
+    try:
+        await pool.execute('DELETE FROM "user" WHERE email = $1', BENCH_EMAIL)
+        await pool.execute(
+            'INSERT INTO "user" (email, password_hash, city) VALUES ($1, $2, $3)',
+            BENCH_EMAIL, await passwords.hash_password(PASSWORD), "Beograd")
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for mode in args.modes:
+                await run_mode(client, mode, args)
+        await pool.execute('DELETE FROM "user" WHERE email = $1', BENCH_EMAIL)
+    finally:
+        await db.close_pool()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dsn", default=os.getenv("BENCH_DATABASE_URL"))
+    ap.add_argument("--rate", type=float, default=200, help="logins per second")
+    ap.add_argument("--seconds", type=float, default=3)
+    ap.add_argument("--rounds", type=int, default=10, help="bcrypt cost for the bench user (BCRYPT_ROUNDS)")
+    ap.add_argument("--probe-interval", type=float, default=0.01)
+    ap.add_argument("--modes", nargs="+", default=["pool", "inline"], choices=["pool", "inline"])
+    args = ap.parse_args()
+    if not args.dsn:
+        ap.error("set BENCH_DATABASE_URL or --dsn (never the production database)")
+    # read by api.passwords at import
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
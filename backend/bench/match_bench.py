@@ -0,0 +1,66 @@
+# backend/bench/match_bench.py
+#   cd backend && python -m bench.match_bench --users 5000 --incidents 300
+# Compares the vectorized PointMatcher against the old per-pair geopy.geodesic loop
+# and checks that they only disagree inside the documented tolerance band.
+import argparse, random, time
+from geopy.distance import geodesic
+
+from worker.spatial import PointMatcher, HAVERSINE_REL_TOLERANCE
+
+BELGRADE_BBOX = (44.74, 20.33, 44.86, 20.55)  # minLat, minLon, maxLat, maxLon
+
+def _rand_point(rng: random.Random) -> tuple[float, float]:
+    return rng.uniform(BELGRADE_BBOX[0], BELGRADE_BBOX[2]), rng.uniform(BELGRADE_BBOX[1], BELGRADE_BBOX[3])
+
+def geodesic_match(points, owners, incidents, threshold_km):
+    out = []
+    for ilat, ilon in incidents:
+        hit = set()
+        for o, (plat, plon) in zip(owners, points):
+            if o not in hit and geodesic((ilat, ilon), (plat, plon)).km <= threshold_km:
+                hit.add(o)
+        out.append(hit)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=2000)
+    ap.add_argument("--addrs-per-user", type=int, default=2)
+    ap.add_argument("--incidents", type=int, default=200)
+    ap.add_argument("--threshold-km", type=float, default=0.7)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    owners, points = [], []
+    for u in range(args.users):
+        for _ in range(args.addrs_per_user):
+            owners.append(u)
+            points.append(_rand_point(rng))
+    incidents = [_rand_point(rng) for _ in range(args.incidents)]
+
+    t0 = time.perf_counter()
+    matcher = PointMatcher(owners, [p[0] for p in points], [p[1] for p in points])
+    fast = matcher.match([i[0] for i in incidents], [i[1] for i in incidents], args.threshold_km)
+    t_fast = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    slow = geodesic_match(points, owners, incidents, args.threshold_km)
+    t_slow = time.perf_counter() - t0
+
+    pairs = len(points) * len(incidents)
+    print(f"pairs={pairs} vectorized={t_fast*1000:.1f}ms geodesic={t_slow*1000:.1f}ms speedup={t_slow/max(t_fast,1e-9):.0f}x")
+
+    # every disagreement must be a pair within the tolerance band around the threshold
+    band = args.threshold_km * HAVERSINE_REL_TOLERANCE
+    bad = 0
+    for (ilat, ilon), f, s in zip(incidents, fast, slow):
+        for o in set(f.tolist()) ^ s:
+            d = min(geodesic((ilat, ilon), points[k]).km for k, ow in enumerate(owners) if ow == o)
+            if abs(d - args.threshold_km) > band:
+                bad += 1
+    print(f"disagreements outside ±{band*1000:.1f} m band: {bad}")
+    raise SystemExit(1 if bad else 0)
+
+if __name__ == "__main__":
+    main()
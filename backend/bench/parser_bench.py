@@ -0,0 +1,117 @@
+# backend/bench/parser_bench.py
+#   cd backend && python -m bench.parser_bench [--addresses 20000] [--repeat 5] [--fuzz 2000]
+# Times worker.parser.parse_bvk against the previous implementation (inlined
+# below) on a large synthetic BVK bulletin, and checks that both return exactly
+# the same items on it and on randomly mangled bulletins (stray dashes,
+# semicolons, empty entries, NBSPs, newlines, municipality names without colons).
+import argparse, random, re, time
+
+from worker import parser
+from worker.parser import OPS, OPS_RE, TIME_RE
+
+def legacy_parse_bvk(text: str):
+    s = re.sub(r"\s+", " ", text).strip()
+
+    mtime = TIME_RE.search(s)
+    until = f"{mtime.group(1).zfill(2)}:{mtime.group(2)}" if mtime else None
+
+    items = []
+    matches = list(OPS_RE.finditer(s))
+    if not matches:
+        return items
+
+    for i, m in enumerate(matches):
+        opst = m.group("opstina")
+        start = m.end()
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(s)
+        seg = s[start:end].strip(" ,;–-")
+
+        addrs = [a.strip(" ,;–-") for a in re.split(r",\s*", seg) if a.strip()]
+        for addr in addrs:
+            addr = re.sub(r"\s+–\s+", ", ", addr)
+            addr = re.sub(r"\s+-\s+", ", ", addr)
+            addr = re.sub(r"\s{2,}", " ", addr).strip(" ,;–-")
+
+            title = f"{opst}: {addr}"
+            desc = f"До {until} — {title}" if until else title
+            items.append({
+                "title": title,
+                "description": desc,
+                "address_text": f"{opst}, {addr}",
+            })
+    return items
+
+STREETS = ["Булевар краља Александра", "Устаничка", "Цвијићева", "Гандијева", "Јурија Гагарина",
+           "Војводе Степе", "Кнеза Милоша", "Вука Караџића", "Скадарска", "Његошева"]
+
+def bulletin(n_addresses: int, rng: random.Random) -> str:
+    """'До 16:00' then municipality blocks, ~n_addresses addresses in total."""
+    parts = ["Кварови на мрежи 06.10.2025.", "До 16:00 часова без воде су потрошачи у улицама:"]
+    left = n_addresses
+    while left > 0:
+        k = min(left, rng.randint(5, 60))
+        addrs = []
+        for _ in range(k):
+            a = f"{rng.choice(STREETS)} {rng.randint(1, 200)}"
+            if rng.random() < 0.1:
+                a += f" - {rng.randint(201, 300)}"
+            if rng.random() < 0.05:
+                a = f"насеље {rng.choice(STREETS)} – {a}"
+            addrs.append(a)
+        parts.append(f"{rng.choice(OPS)}: " + ", ".join(addrs))
+        left -= k
+    parts.append("Распоред аутоцистерни: ...")
+    return "\n".join(parts)
+
+JUNK = [" - ", " – ", ", -, ", ";", ", ,", "  ", " ", "\n", ",", "-", " ,", ": ", "–"]
+
+def mangle(text: str, rng: random.Random) -> str:
+    out = list(text)
+    for _ in range(rng.randint(1, 30)):
+        i = rng.randrange(len(out) + 1)
+        r = rng.random()
+        if r < 0.7:
+            out.insert(i, rng.choice(JUNK))
+        elif r < 0.85:
+            out.insert(i, rng.choice(OPS) + rng.choice([":", " :", " ", ": -", ":,"]))
+        elif out:
+            del out[min(i, len(out) - 1)]
+    return "".join(out)
+
+def timeit(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--addresses", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--fuzz", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    rng = random.Random(args.seed)
+
+    text = bulletin(args.addresses, rng)
+    old, new = legacy_parse_bvk(text), parser.parse("BVK", text)
+    ok = old == new
+    t_old = timeit(legacy_parse_bvk, text, args.repeat)
+    t_new = timeit(parser.parse_bvk, text, args.repeat)
+    print(f"bulletin: {len(text)/1024:.0f}KB items={len(new)} legacy={t_old*1000:.1f}ms "
+          f"parse_bvk={t_new*1000:.1f}ms speedup={t_old/max(t_new,1e-9):.1f}x same={ok}")
+
+    bad = 0
+    for i in range(args.fuzz):
+        sample = mangle(bulletin(rng.randint(1, 40), rng), rng)
+        if legacy_parse_bvk(sample) != parser.parse_bvk(sample):
+            bad += 1
+            if bad <= 3:
+                print(f"  mismatch on fuzz case {i}: {sample[:200]!r}")
+    print(f"fuzz: {args.fuzz} mangled bulletins, mismatches={bad}")
+    raise SystemExit(0 if ok and not bad else 1)
+
+if __name__ == "__main__":
+    main()
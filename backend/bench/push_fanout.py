@@ -0,0 +1,60 @@
+# backend/bench/push_fanout.py
+#   cd backend && python -m bench.push_fanout --clients 10000 --events 20
+# Attaches N idle SSE subscribers to the Broadcaster (no DB), then publishes
+# notifications as the LISTEN callback would and measures fan-out latency.
+# Whatever N is, the API holds exactly one listener connection and the idle
+# clients issue no queries; this shows what they do cost in the process.
+import argparse, asyncio, time, tracemalloc
+
+from api.push import Broadcaster
+
+async def run(args):
+    b = Broadcaster()
+    received = 0
+    done = asyncio.Event()
+
+    async def client(sub):
+        nonlocal received
+        while True:
+            cursor = await sub.next(timeout=3600)
+            if cursor is None:
+                continue
+            received += 1
+            if received == args.clients * args.events:
+                done.set()
+
+    tracemalloc.start()
+    subs = [b.subscribe() for _ in range(args.clients)]
+    tasks = [asyncio.create_task(client(s)) for s in subs]
+    await asyncio.sleep(0.5)  # let every client park on its Event
+    mem, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t_idle = time.process_time()
+    await asyncio.sleep(args.idle_seconds)
+    idle_cpu = time.process_time() - t_idle
+
+    t0 = time.perf_counter()
+    for i in range(args.events):
+        b.publish(str(i + 1))
+        await asyncio.sleep(0)  # one loop turn per event so clients see every cursor
+        while received < args.clients * (i + 1):
+            await asyncio.sleep(0)
+    await asyncio.wait_for(done.wait(), 60)
+    elapsed = time.perf_counter() - t0
+
+    for t in tasks:
+        t.cancel()
+    print(f"clients={args.clients} memory≈{mem / args.clients:.0f} B/client "
+          f"idle_cpu={idle_cpu * 1000:.1f} ms over {args.idle_seconds}s db_connections=1 (listener) queries=0")
+    print(f"events={args.events} deliveries={received} fan-out={elapsed / args.events * 1000:.1f} ms/event")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=10000)
+    ap.add_argument("--events", type=int, default=20)
+    ap.add_argument("--idle-seconds", type=float, default=2.0)
+    asyncio.run(run(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+# backend/bench/replay.py
+#   cd backend && BENCH_DATABASE_URL=postgresql://.../h2o_bench python -m bench.replay \
+#       [--addresses 5000] [--users 2000] [--geo-latency-ms 40] [--save-baseline]
+# Drives worker.pipeline.run_scrape_once end to end against a throwaway Postgres
+# (migrations applied; the bench TRUNCATEs incident, source_cache, geocode_cache,
+# notification_outbox, job_queue and incident_change), an in-process aiosmtpd server, a
+# stubbed Geoapify with fixed latency, and an httpx.MockTransport serving BVK pages.
+# The pages are synthetic: no recorded BVK pages are committed (bench/fixtures/
+# holds only .gitkeep), so out of the box this replays generated accordions in the
+# bvk.rs markup, not real bulletins. Captures saved as bench/fixtures/*.html (see
+# bench/section_bench.py) are replayed as extra rounds. Each round reports per-stage timings
+# (worker.timing), Python allocations (tracemalloc), database work
+# (pg_stat_database deltas, pg_stat_statements calls when installed) and the mail
+# sent; results are compared with bench/replay_baseline.json (per machine, not in git).
+import argparse, asyncio, hashlib, json, os, random, re, sys, time, tracemalloc
+from datetime import date
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+FIXTURES = HERE / "fixtures"
+BASELINE = HERE / "replay_baseline.json"
+DATE_RE = re.compile(r"(\d{1,2})\s*\.\s*(\d{1,2})\s*\.\s*(\d{4})")
+BENCH_DOMAIN = "bench.invalid"
+
+# ---- synthetic BVK pages ----
+
+STREETS = ["Булевар краља Александра", "Устаничка", "Цвијићева", "Гандијева", "Јурија Гагарина",
+           "Војводе Степе", "Кнеза Милоша", "Вука Караџића", "Скадарска", "Његошева"]
+
+def addresses(n: int, rng: random.Random) -> list[tuple[str, str]]:
+    from worker.parser import OPS
+    return [(rng.choice(OPS), f"{rng.choice(STREETS)} {rng.randint(1, 400)}") for _ in range(n)]
+
+def churn(addrs: list[tuple[str, str]], fraction: float, rng: random.Random) -> list[tuple[str, str]]:
+    out = list(addrs)
+    for i in rng.sample(range(len(out)), int(len(out) * fraction)):
+        out[i] = addresses(1, rng)[0]
+    return out
+
+def page(today: date, addrs: list[tuple[str, str]], until: str = "16:00", days: int = 7) -> str:
+    """Elementor accordion like bvk.rs: today's item holds addrs, older days a few lines each."""
+    by_ops: dict[str, list[str]] = {}
+    for opst, street in addrs:
+        by_ops.setdefault(opst, []).append(street)
+    items = []
+    for k in range(days):
+        d = date.fromordinal(today.toordinal() - k)
+        if k == 0:
+            body = "".join(f"<p>{o}: {', '.join(s)}</p>" for o, s in by_ops.items())
+        else:
+            body = f"<p>Звездара: Устаничка {k}, Цвијићева {k}</p>"
+        items.append(
+            f'<div class="elementor-accordion-item">'
+            f'<div class="elementor-tab-title" role="tab"><a href="">{d.day:02d}.{d.month:02d}.{d.year}.</a></div>'
+            f'<div class="elementor-tab-content elementor-clearfix"><p>До {until}</p>{body}</div></div>'
+        )
+    return f'<html><body><div class="elementor-accordion">{"".join(items)}</div></body></html>'
+
+# ---- stand-ins ----
+
+class Origin:
+    """MockTransport handler standing in for bvk.rs; validators are honoured only when asked to."""
+
+    def __init__(self):
+        self.html = ""
+        self.etag: str | None = None
+        self.honour_validators = True
+        self.requests = 0
+
+    def serve(self, html: str, etag: str | None, honour_validators: bool = True):
+        self.html, self.etag, self.honour_validators = html, etag, honour_validators
+
+    def __call__(self, request):
+        import httpx
+        self.requests += 1
+        if self.honour_validators and self.etag and request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        if self.etag:
+            headers["ETag"] = self.etag
+        return httpx.Response(200, headers=headers, content=self.html.encode("utf-8"))
+
+def stub_geocoder(latency: float, miss_rate: float):
+    """Deterministic Belgrade coordinates per query after `latency` seconds; some queries have no match."""
+    def geocode_remote(address: str):
+        time.sleep(latency)
+        h = hashlib.blake2b(address.encode("utf-8"), digest_size=8).digest()
+        if h[0] / 255 < miss_rate:
+            return None, None
+        return 44.70 + h[1] / 255 * 0.20, 20.30 + h[2] / 255 * 0.30
+    return geocode_remote
+
+class CountingHandler:
+    def __init__(self):
+        self.count = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.count += 1
+        return "250 OK"
+
+# ---- database ----
+
+STAT_COLS = ("xact_commit", "xact_rollback", "tup_returned", "tup_fetched",
+             "tup_inserted", "tup_updated", "tup_deleted", "blks_read", "blks_hit")
+
+def db_counters(conn) -> dict:
+    with conn.cursor() as cur:
+        try:
+            cur.execute("SELECT pg_stat_force_next_flush()")   # PG15+; older servers flush on their own
+        except Exception:
+            conn.rollback()
+        cur.execute("SELECT pg_stat_clear_snapshot()")
+        cur.execute(f"SELECT {', '.join(STAT_COLS)}, sessions FROM pg_stat_database WHERE datname = current_database()")
+        row = cur.fetchone()
+        out = dict(zip(STAT_COLS + ("sessions",), row))
+        try:
+            cur.execute("SELECT sum(calls)::bigint FROM pg_stat_statements WHERE dbid = "
+                        "(SELECT oid FROM pg_database WHERE datname = current_database())")
+            out["statements"] = cur.fetchone()[0]
+        except Exception:
+            conn.rollback()
+            out["statements"] = None
+    conn.commit()
+    return out
+
+def delta(after: dict, before: dict) -> dict:
+    return {k: (after[k] - before[k]) if after[k] is not None and before[k] is not None else None for k in after}
+
+def reset_db(conn, n_users: int, rng: random.Random):
+    from worker.parser import OPS
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE incident, incident_change, source_cache, geocode_cache, notification_outbox, job_queue")
+        cur.execute('DELETE FROM "user" WHERE email LIKE %s', (f"%@{BENCH_DOMAIN}",))
+        rows = []
+        for i in range(n_users):
+            lats = [44.70 + rng.random() * 0.20 for _ in range(rng.randint(1, 3))]
+            lons = [20.30 + rng.random() * 0.30 for _ in lats]
+            rows.append((f"user{i}@{BENCH_DOMAIN}", "x", "Beograd", rng.sample(OPS, 1) if rng.random() < 0.3 else [],
+                         [f"Адреса {j}" for j in range(len(lats))], lats, lons))
+        cur.executemany("""
+            INSERT INTO "user" (email, password_hash, city, areas, addressOfUser, addressLat, addressLon)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, rows)
+    conn.commit()
+
+# ---- rounds ----
+
+def fixture_rounds() -> list[tuple[str, str, date]]:
+    out = []
+    for path in sorted(FIXTURES.glob("*.html")):
+        html = path.read_text(encoding="utf-8", errors="replace")
+        m = DATE_RE.search(html)
+        if m:
+            out.append((path.stem, html, date(int(m.group(3)), int(m.group(2)), int(m.group(1)))))
+    return out
+
+async def run_round(name: str, args, conn, pool, smtp: CountingHandler) -> dict:
+    from worker import geocache, jobs, pipeline, scrape
+    from worker.timing import stages
+
+    stages.reset()
+    geo_before = dict(geocache.geocode_stats())
+    db_before = db_counters(conn)
+    mail_before = smtp.count
+    if args.alloc:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    results = await pipeline.run_scrape_once([scrape.SOURCES[0]])
+    # the notify_incidents jobs the scrape queued: matching and mail, as the worker's JobRunner runs them
+    await jobs.drain_jobs(pool)
+    wall = time.perf_counter() - t0
+    alloc = None
+    if args.alloc:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        alloc = {"retained_kb": round(current / 1024, 1), "peak_kb": round(peak / 1024, 1)}
+    await asyncio.sleep(0.2)   # let closed backends report their stats
+    geo_after = geocache.geocode_stats()
+    return {
+        "round": name,
+        "wall_s": round(wall, 4),
+        "result": results[0],
+        "stages": stages.snapshot(),
+        "alloc": alloc,
+        "db": delta(db_counters(conn), db_before),
+        "geocode": {k: geo_after[k] - geo_before.get(k, 0) for k in ("lru_hits", "db_hits", "misses", "api_calls")},
+        "mail_sent": smtp.count - mail_before,
+    }
+
+async def replay(args) -> list[dict]:
+    import asyncpg, psycopg
+    from aiosmtpd.controller import Controller
+    import httpx
+    from worker import geocache, pipeline, scrape
+    from worker import tasks  # noqa: F401  registers the job handlers
+
+    rng = random.Random(args.seed)
+    smtp = CountingHandler()
+    ctrl = Controller(smtp, hostname="127.0.0.1", port=args.smtp_port)
+    ctrl.start()
+
+    geocache.geocode_remote = stub_geocoder(args.geo_latency_ms / 1000, args.geo_miss_rate)
+    origin = Origin()
+    pipeline._client = httpx.AsyncClient(transport=httpx.MockTransport(origin))
+
+    today = date.today()
+    scrape._belgrade_today = lambda: (today.day, today.month, today.year)
+    base = addresses(args.addresses, rng)
+    changed = churn(base, args.churn, rng)
+
+    plan = [
+        ("cold", page(today, base), '"v1"', True),
+        ("etag-304", page(today, base), '"v1"', True),
+        ("same-section-200", page(today, base), None, False),
+        (f"churn-{int(args.churn * 100)}pct", page(today, changed), '"v2"', True),
+        ("descriptions-changed", page(today, changed, until="18:00"), '"v3"', True),
+    ]
+
+    out = []
+    conn = psycopg.connect(os.environ["DATABASE_URL"])
+    pool = await asyncpg.create_pool(os.environ["DATABASE_URL"], min_size=1, max_size=6)
+    try:
+        reset_db(conn, args.users, rng)
+        for name, html, etag, honour in plan:
+            origin.serve(html, etag, honour)
+            out.append(await run_round(name, args, conn, pool, smtp))
+        for name, html, day in fixture_rounds():
+            scrape._belgrade_today = lambda d=day: (d.day, d.month, d.year)
+            origin.serve(html, None)
+            out.append(await run_round(f"fixture:{name}", args, conn, pool, smtp))
+    finally:
+        conn.close()
+        await pool.close()
+        await pipeline.close_http_client()
+        ctrl.stop()
+    return out
+
+# ---- report / baseline ----
+
+def report(rounds: list[dict]):
+    for r in rounds:
+        res = r["result"]
+        st = " ".join(f"{k}={v['seconds'] * 1000:.0f}ms" for k, v in r["stages"].items())
+        db = r["db"]
+        alloc = f" peak={r['alloc']['peak_kb']:.0f}KB" if r["alloc"] else ""
+        print(f"{r['round']}: wall={r['wall_s'] * 1000:.0f}ms status={res.get('status')} "
+              f"ins={res.get('inserted')} upd={res.get('updated')} del={res.get('deleted')} "
+              f"mail={r['mail_sent']} geo_api={r['geocode']['api_calls']}{alloc}")
+        print(f"    stages: {st}")
+        print(f"    db: xacts={db['xact_commit']} sessions={db['sessions']} statements={db['statements']} "
+              f"ins={db['tup_inserted']} upd={db['tup_updated']} del={db['tup_deleted']}")
+
+def compare(rounds: list[dict], baseline: dict, tolerance: float, floor_ms: float) -> list[str]:
+    """Regressions: a timing more than `tolerance` slower (and floor_ms in absolute terms), or more transactions."""
+    old = {r["round"]: r for r in baseline.get("rounds", [])}
+    problems = []
+    for r in rounds:
+        b = old.get(r["round"])
+        if not b:
+            continue
+        pairs = [("wall", r["wall_s"], b["wall_s"])]
+        pairs += [(k, v["seconds"], b["stages"][k]["seconds"]) for k, v in r["stages"].items() if k in b["stages"]]
+        for what, now, then in pairs:
+            if now > then * (1 + tolerance) and (now - then) * 1000 > floor_ms:
+                problems.append(f"{r['round']}/{what}: {then * 1000:.0f}ms -> {now * 1000:.0f}ms")
+        x_now, x_then = r["db"].get("xact_commit"), b["db"].get("xact_commit")
+        if x_now is not None and x_then is not None and x_now > x_then * (1 + tolerance) + 2:
+            problems.append(f"{r['round']}/xacts: {x_then} -> {x_now}")
+    return problems
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dsn", default=os.getenv("BENCH_DATABASE_URL"),
+                    help="throwaway database with migrations applied (tables are truncated!)")
+    ap.add_argument("--addresses", type=int, default=5000)
+    ap.add_argument("--users", type=int, default=2000)
+    ap.add_argument("--churn", type=float, default=0.1)
+    ap.add_argument("--geo-latency-ms", type=float, default=40)
+    ap.add_argument("--geo-miss-rate", type=float, default=0.05)
+    ap.add_argument("--smtp-port", type=int, default=8026)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--no-alloc", dest="alloc", action="store_false", help="skip tracemalloc (it slows every stage)")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--floor-ms", type=float, default=20)
+    ap.add_argument("--json", type=Path, help="also write this run's results here")
+    args = ap.parse_args()
+    if not args.dsn:
+        ap.error("set BENCH_DATABASE_URL or --dsn (never the production database)")
+
+    # before the worker modules read their settings at import time
+    os.environ.update({
+        "DATABASE_URL": args.dsn, "SMTP_HOST": "127.0.0.1", "SMTP_START_TLS": "0",
+        "SMTP_PORT": str(args.smtp_port), "EMAIL_SENDER": "", "EMAIL_PASSWORD": "",
+    })
+
+    rounds = asyncio.run(replay(args))
+    report(rounds)
+
+    config = {k: getattr(args, k) for k in ("addresses", "users", "churn", "geo_latency_ms", "geo_miss_rate", "seed", "alloc")}
+    doc = {"config": config, "python": sys.version.split()[0], "rounds": rounds}
+    if args.json:
+        args.json.write_text(json.dumps(doc, indent=2, default=str, ensure_ascii=False))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(doc, indent=2, default=str, ensure_ascii=False))
+        print(f"baseline written to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print("no baseline yet (run with --save-baseline)")
+        return
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("config") != config:
+        print(f"baseline was recorded with {baseline.get('config')}; not comparable")
+        return
+    problems = compare(rounds, baseline, args.tolerance, args.floor_ms)
+    for p in problems:
+        print(f"REGRESSION {p}")
+    print(f"compared with {args.baseline}: {len(problems)} regression(s)")
+    raise SystemExit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# backend/bench/section_bench.py
+#   cd backend && python -m bench.section_bench [--repeat 50] [--date 06.10.2025]
+# Times worker.scrape.section_hash with the BeautifulSoup engine vs the lxml fast
+# path over saved BVK pages in bench/fixtures/*.html (save them with
+# `curl -s https://www.bvk.rs/kvarovi-na-mrezi/ > bench/fixtures/bvk-YYYYMMDD.html`),
+# plus a synthetic page, and checks both engines extract the same section.
+import argparse, re, time
+from datetime import date
+from pathlib import Path
+
+from worker import scrape
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+DATE_RE = re.compile(r"(\d{1,2})\s*\.\s*(\d{1,2})\s*\.\s*(\d{4})")
+
+def synthetic_page(today: date, days: int = 14, addrs: int = 60, nav_items: int = 400, depth: int = 25) -> str:
+    """Elementor-like page: deep wrapper nesting, a big menu, one accordion item per day."""
+    nav = "".join(f'<li class="menu-item"><a href="/p{i}">Страница {i}</a></li>' for i in range(nav_items))
+    items = []
+    for k in range(days):
+        d = date.fromordinal(today.toordinal() - k)
+        body = ", ".join(f"Улица {k}-{i} {i}" for i in range(addrs))
+        items.append(
+            f'<div class="elementor-accordion-item">'
+            f'<div class="elementor-tab-title" aria-controls="elementor-tab-content-{k}" role="tab">'
+            f'<a href="">{d.day:02d}.{d.month:02d}.{d.year}.</a></div>'
+            f'<div id="elementor-tab-content-{k}" class="elementor-tab-content elementor-clearfix">'
+            f'<p>До 16:00</p><p>Звездара: {body}</p><p>Земун: {body}</p></div></div>'
+        )
+    inner = '<div class="elementor-accordion">' + "".join(items) + "</div>"
+    for i in range(depth):
+        inner = f'<div class="elementor-widget-wrap level-{i}"><span></span>{inner}</div>'
+    return f"<html><head><script>var x=1;</script></head><body><nav><ul>{nav}</ul></nav>{inner}</body></html>"
+
+def pinned_today(day: date):
+    return lambda: (day.day, day.month, day.year)
+
+def bench(name: str, html: str, day: date, repeat: int):
+    scrape._belgrade_today = pinned_today(day)
+    results = {}
+    for engine in ("soup", "lxml"):
+        scrape._title_strategy.clear()
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            h, text, used = scrape.section_hash(html, "", key=name, engine=engine)
+        results[engine] = ((time.perf_counter() - t0) / repeat, h, used)
+    # warm strategy memo, as in the scheduler after the first run
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        h_auto, _, _ = scrape.section_hash(html, "", key=name, engine="auto")
+    t_auto = (time.perf_counter() - t0) / repeat
+
+    soup_t, soup_h, soup_used = results["soup"]
+    lx_t, lx_h, lx_used = results["lxml"]
+    same = soup_h == lx_h == h_auto
+    print(f"{name}: html={len(html)/1024:.0f}KB soup={soup_t*1000:.1f}ms lxml={lx_t*1000:.1f}ms "
+          f"auto(warm)={t_auto*1000:.1f}ms speedup={soup_t/max(lx_t,1e-9):.1f}x same_section={same}")
+    if not same:
+        print(f"  soup: {soup_used}\n  lxml: {lx_used}")
+    return same
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--date", help="dd.mm.yyyy treated as 'today' for fixtures (default: first date on the page)")
+    args = ap.parse_args()
+
+    ok = bench("synthetic", synthetic_page(date.today()), date.today(), args.repeat)
+    for path in sorted(FIXTURES.glob("*.html")):
+        html = path.read_text(encoding="utf-8", errors="replace")
+        m = DATE_RE.search(args.date or "") or DATE_RE.search(html)
+        if not m:
+            print(f"{path.name}: no date found, skipped")
+            continue
+        day = date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+        ok = bench(path.stem, html, day, args.repeat) and ok
+    raise SystemExit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# backend/bench/smtp_throughput.py
+#   cd backend && python -m bench.smtp_throughput --messages 2000 --pool 4 --concurrency 16
+# Sends through a local aiosmtpd stand-in, once the old way (one aiosmtplib.send
+# per recipient, serial) and once through the pooled worker.mailer.deliver.
+import argparse, asyncio, time
+from email.message import EmailMessage
+
+import aiosmtplib
+from aiosmtpd.controller import Controller
+
+from worker.mailer import Outgoing, SmtpPool, deliver
+
+class CountingHandler:
+    def __init__(self):
+        self.count = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.count += 1
+        return "250 OK"
+
+async def serial_send(host: str, port: int, messages: list[Outgoing]):
+    for out in messages:
+        msg = EmailMessage()
+        msg["From"] = "bench@localhost"
+        msg["To"] = out.to
+        msg["Subject"] = out.subject
+        msg.set_content(out.body)
+        await aiosmtplib.send(msg, hostname=host, port=port, start_tls=False)
+
+async def pooled_send(host: str, port: int, messages: list[Outgoing], pool_size: int, concurrency: int):
+    pool = SmtpPool(hostname=host, port=port, username="", password="", start_tls=False, size=pool_size)
+    try:
+        failed = await deliver(pool, messages, concurrency)
+    finally:
+        await pool.close()
+    return failed, pool.connects
+
+async def run(args):
+    handler = CountingHandler()
+    ctrl = Controller(handler, hostname="127.0.0.1", port=args.port)
+    ctrl.start()
+    try:
+        msgs = [Outgoing(f"user{i}@example.com", "bench", "body " * 40) for i in range(args.messages)]
+
+        serial_n = min(args.messages, args.serial_limit)
+        t0 = time.perf_counter()
+        await serial_send(ctrl.hostname, ctrl.port, msgs[:serial_n])
+        t_serial = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        failed, connects = await pooled_send(ctrl.hostname, ctrl.port, msgs, args.pool, args.concurrency)
+        t_pooled = time.perf_counter() - t0
+    finally:
+        ctrl.stop()
+
+    print(f"serial:  {serial_n} msgs in {t_serial:.2f}s → {serial_n / t_serial:.0f} msg/s ({serial_n} connections)")
+    print(f"pooled:  {len(msgs)} msgs in {t_pooled:.2f}s → {len(msgs) / t_pooled:.0f} msg/s "
+          f"({connects} connections, {len(failed)} failed)")
+    print(f"server received {handler.count}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=2000)
+    ap.add_argument("--serial-limit", type=int, default=500, help="cap for the slow serial baseline")
+    ap.add_argument("--pool", type=int, default=4)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--port", type=int, default=8025)
+    asyncio.run(run(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# backend/bench/startup.py
+#   cd backend && python -m bench.startup [--runs 5] [--top 12] [--update-budget]
+# Cold-start cost of each process entry module, measured in fresh interpreters
+# with `python -X importtime -c "import <module>"` (median of --runs), checked
+# against bench/startup_budget.json:
+#   max_ms - ceiling for the module's cumulative import time
+#   forbid - top-level packages the entry point must not load at startup
+#            (they belong behind a first-use import)
+# Exits 1 when a budget is broken; --update-budget rewrites max_ms as the
+# current median plus --headroom and keeps the forbid lists.
+import argparse, json, statistics, subprocess, sys, time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+BUDGET_FILE = Path(__file__).resolve().parent / "startup_budget.json"
+
+def importtime(module: str) -> tuple[float, float, list[tuple[str, float, int]]]:
+    """-> (cumulative import ms of `module`, process wall ms, [(name, cumulative ms, depth)] of its subtree)"""
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=BACKEND, capture_output=True, text=True)
+    wall = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        raise SystemExit(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    # children are printed before their parent; interpreter startup (site, .pth hooks) comes first
+    subtree = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum_us, name = line.split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        subtree.append((name.strip(), int(cum_us) / 1000, depth))
+        if depth == 0:
+            if name.strip() == module:
+                return subtree[-1][1], wall, subtree
+            subtree = []
+    raise SystemExit(f"{module} missing from the -X importtime output")
+
+def measure(module: str, runs: int) -> dict:
+    totals, walls, last = [], [], []
+    for _ in range(runs):
+        total, wall, rows = importtime(module)
+        totals.append(total)
+        walls.append(wall)
+        last = rows
+    loaded = {name.split(".")[0] for name, _, _ in last}
+    # direct imports of the entry module, heaviest first
+    top = sorted(((n, ms) for n, ms, d in last if d == 1), key=lambda r: -r[1])
+    return {"import_ms": statistics.median(totals), "wall_ms": statistics.median(walls),
+            "loaded": loaded, "top": top}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=12, help="heaviest direct imports to list")
+    ap.add_argument("--update-budget", action="store_true")
+    ap.add_argument("--headroom", type=float, default=0.5, help="fraction added to the median by --update-budget")
+    args = ap.parse_args()
+
+    budget = json.loads(BUDGET_FILE.read_text())
+    failed = False
+    for module, limits in budget.items():
+        m = measure(module, args.runs)
+        print(f"{module}: import {m['import_ms']:.0f}ms (budget {limits['max_ms']}ms), "
+              f"process {m['wall_ms']:.0f}ms, {len(m['loaded'])} top-level packages")
+        for name, ms in m["top"][:args.top]:
+            print(f"    {ms:8.1f}ms  {name}")
+        bad = sorted(set(limits.get("forbid", [])) & m["loaded"])
+        if bad:
+            print(f"  FAIL loads {', '.join(bad)} at startup")
+            failed = True
+        if args.update_budget:
+            limits["max_ms"] = int(m["import_ms"] * (1 + args.headroom) + 0.5)
+        elif m["import_ms"] > limits["max_ms"]:
+            print(f"  FAIL {m['import_ms']:.0f}ms > {limits['max_ms']}ms")
+            failed = True
+
+    if args.update_budget:
+        BUDGET_FILE.write_text(json.dumps(budget, indent=2, ensure_ascii=False) + "\n")
+        print(f"budget written to {BUDGET_FILE.name}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,9 @@
 ALTER TABLE incident
   ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION,
   ADD COLUMN IF NOT EXISTS lon DOUBLE PRECISION,
-  ADD COLUMN seen boolean DEFAULT false;
+  ADD COLUMN IF NOT EXISTS seen boolean DEFAULT false;
 
-ALTER TABLE user
+ALTER TABLE "user"
   ADD COLUMN IF NOT EXISTS city TEXT NOT NULL,
-  ADD COLUMN IF NOT EXISTS areas TEXT,
+  ADD COLUMN IF NOT EXISTS areas TEXT[],
   ADD COLUMN IF NOT EXISTS  addressOfUser TEXT[];
-    
-    
-   
\ No newline at end of file
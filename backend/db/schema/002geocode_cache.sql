@@ -0,0 +1,10 @@
+-- geocoder answers keyed by script-insensitive address key (see worker/textnorm.py)
+-- found = false rows are negative results, retried once older than GEOCODE_NEGATIVE_TTL_HOURS
+CREATE TABLE IF NOT EXISTS geocode_cache (
+  key TEXT PRIMARY KEY,
+  query TEXT NOT NULL,
+  lat DOUBLE PRECISION,
+  lon DOUBLE PRECISION,
+  found BOOLEAN NOT NULL,
+  updated_at TIMESTAMPTZ DEFAULT now()
+);
@@ -0,0 +1,4 @@
+-- subscriber address coordinates, parallel to addressOfUser (NULL where the geocoder had no match)
+ALTER TABLE "user"
+  ADD COLUMN IF NOT EXISTS addressLat DOUBLE PRECISION[],
+  ADD COLUMN IF NOT EXISTS addressLon DOUBLE PRECISION[];
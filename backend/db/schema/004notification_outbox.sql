@@ -0,0 +1,18 @@
+-- durable email outbox: rows are written before any SMTP traffic and marked sent after it
+CREATE TABLE IF NOT EXISTS notification_outbox (
+  id BIGSERIAL PRIMARY KEY,
+  email TEXT NOT NULL,
+  subject TEXT NOT NULL,
+  body TEXT NOT NULL,
+  dedupe_key TEXT UNIQUE NOT NULL,        -- sha1(email + incidents), guards against double enqueue
+  status TEXT NOT NULL DEFAULT 'pending', -- 'pending' | 'sending' | 'sent' | 'failed'
+  attempts INT NOT NULL DEFAULT 0,
+  last_error TEXT,
+  next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  locked_at TIMESTAMPTZ,
+  created_at TIMESTAMPTZ DEFAULT now(),
+  sent_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS notification_outbox_due_idx
+  ON notification_outbox (next_attempt_at) WHERE status IN ('pending', 'sending');
@@ -0,0 +1,7 @@
+-- keyset pagination for GET /incidents: ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS incident_created_id_idx ON incident (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS incident_status_created_id_idx ON incident (status, created_at DESC, id DESC);
+
+-- viewport (bbox) filter; rows without coordinates never match it
+CREATE INDEX IF NOT EXISTS incident_lat_lon_idx ON incident (lat, lon)
+  WHERE lat IS NOT NULL AND lon IS NOT NULL;
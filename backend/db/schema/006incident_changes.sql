@@ -0,0 +1,36 @@
+-- change log behind GET /incidents/changes?since=<seq>
+-- one row per insert / visible update / delete of an incident; deletes are the tombstones
+CREATE TABLE IF NOT EXISTS incident_change (
+  seq BIGSERIAL PRIMARY KEY,
+  incident_id BIGINT NOT NULL,
+  op TEXT NOT NULL,                 -- 'upsert' | 'delete'
+  changed_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS incident_change_changed_at_idx ON incident_change (changed_at);
+
+CREATE OR REPLACE FUNCTION incident_log_change() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    INSERT INTO incident_change (incident_id, op) VALUES (OLD.id, 'delete');
+    RETURN OLD;
+  END IF;
+  INSERT INTO incident_change (incident_id, op) VALUES (NEW.id, 'upsert');
+  RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS incident_change_ins_del ON incident;
+CREATE TRIGGER incident_change_ins_del
+  AFTER INSERT OR DELETE ON incident
+  FOR EACH ROW EXECUTE FUNCTION incident_log_change();
+
+-- only updates a client can see; bookkeeping (seen, updated_at) is not a change
+DROP TRIGGER IF EXISTS incident_change_upd ON incident;
+CREATE TRIGGER incident_change_upd
+  AFTER UPDATE ON incident
+  FOR EACH ROW
+  WHEN ((OLD.title, OLD.description, OLD.address_text, OLD.status, OLD.starts_at, OLD.ends_at, OLD.lat, OLD.lon)
+        IS DISTINCT FROM
+        (NEW.title, NEW.description, NEW.address_text, NEW.status, NEW.starts_at, NEW.ends_at, NEW.lat, NEW.lon))
+  EXECUTE FUNCTION incident_log_change();
@@ -0,0 +1,18 @@
+-- durable background jobs: the API enqueues, the worker claims with FOR UPDATE SKIP LOCKED
+CREATE TABLE IF NOT EXISTS job_queue (
+  id BIGSERIAL PRIMARY KEY,
+  kind TEXT NOT NULL,                     -- 'notify_new_user' | 'geocode_user' | 'geocode_incident'
+  payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+  dedupe_key TEXT UNIQUE,                 -- optional: at most one *pending* job per key (cleared on claim)
+  status TEXT NOT NULL DEFAULT 'pending', -- 'pending' | 'running' | 'done' | 'failed'
+  attempts INT NOT NULL DEFAULT 0,
+  max_attempts INT NOT NULL DEFAULT 5,
+  last_error TEXT,
+  run_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  locked_at TIMESTAMPTZ,
+  created_at TIMESTAMPTZ DEFAULT now(),
+  finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS job_queue_due_idx
+  ON job_queue (run_at) WHERE status IN ('pending', 'running');
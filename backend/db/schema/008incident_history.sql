@@ -0,0 +1,32 @@
+-- incidents that left the bulletin; the live incident table only keeps active rows
+-- one partition per calendar month of resolved_at, created/dropped by worker.dbio
+CREATE TABLE IF NOT EXISTS incident_history (
+  id BIGINT NOT NULL,               -- incident.id it had while live
+  source TEXT NOT NULL,
+  source_url TEXT NOT NULL,
+  title TEXT,
+  description TEXT,
+  address_text TEXT,
+  opstina TEXT,                     -- Cyrillic municipality (parser.OPS) or NULL
+  starts_at TIMESTAMPTZ,
+  ends_at TIMESTAMPTZ,
+  dedupe_hash TEXT,
+  lat DOUBLE PRECISION,
+  lon DOUBLE PRECISION,
+  created_at TIMESTAMPTZ,
+  resolved_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (resolved_at, id)
+) PARTITION BY RANGE (resolved_at);
+
+CREATE INDEX IF NOT EXISTS incident_history_opstina_idx ON incident_history (opstina, resolved_at);
+
+-- outages per municipality and local day, kept up to date as rows move to incident_history;
+-- survives partition retirement, so long-range stats never read incident_history either
+CREATE TABLE IF NOT EXISTS incident_daily_stats (
+  day DATE NOT NULL,                -- resolved_at in APP_TZ
+  opstina TEXT NOT NULL,            -- '' when the address has no known municipality
+  source TEXT NOT NULL,
+  resolved INT NOT NULL DEFAULT 0,
+  duration_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,   -- sum of resolved_at - created_at
+  PRIMARY KEY (day, opstina, source)
+);
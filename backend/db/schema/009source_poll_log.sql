@@ -0,0 +1,12 @@
+-- one row per source poll; worker.polling learns each source's update cadence from it
+CREATE TABLE IF NOT EXISTS source_poll_log (
+  id BIGSERIAL PRIMARY KEY,
+  source TEXT NOT NULL,
+  polled_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  status INT,                       -- HTTP status, NULL when the run raised
+  changed BOOLEAN NOT NULL DEFAULT false,   -- today's section differed from the previous poll
+  bytes INT NOT NULL DEFAULT 0,     -- response body size
+  interval_seconds DOUBLE PRECISION -- delay that was planned before this poll
+);
+
+CREATE INDEX IF NOT EXISTS source_poll_log_source_idx ON source_poll_log (source, polled_at);
@@ -0,0 +1,18 @@
+-- /incidents/changes cursors are transaction ids, not seq: seq is assigned at insert
+-- time, so a transaction can commit a lower seq after a reader has moved past it.
+-- A reader takes every row whose writing transaction is below its snapshot xmin
+-- (all committed or aborted) and returns that xmin as the next cursor.
+ALTER TABLE incident_change ADD COLUMN IF NOT EXISTS xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+
+CREATE INDEX IF NOT EXISTS incident_change_xid_idx ON incident_change (xid);
+
+-- highest xid pruned from incident_change; a cursor at or below it has missed rows
+CREATE TABLE IF NOT EXISTS incident_change_pruned (
+  id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+  xid xid8 NOT NULL
+);
+
+-- change-log head: every transaction below it has finished
+CREATE OR REPLACE FUNCTION incident_change_head() RETURNS bigint AS $$
+  SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint
+$$ LANGUAGE sql STABLE;
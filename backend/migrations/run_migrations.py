@@ -8,7 +8,7 @@ DB_DSN = os.getenv(
 )
 
 def run_migrations():
-    sql_files = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "../api/db/schema/*.sql")))
+    sql_files = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "../db/schema/*.sql")))
     with psycopg.connect(DB_DSN) as conn, conn.cursor() as cur:
         for f in sql_files:
             print(f"→ running {f}")
@@ -1,12 +1,21 @@
-import os, psycopg
-from dotenv import load_dotenv
+import hashlib, logging, os, psycopg, zoneinfo
+from collections import defaultdict
 from datetime import datetime, timezone
-from pathlib import Path
 
-BASE_DIR = Path(__file__).resolve().parents[1]
-load_dotenv(BASE_DIR / ".env")
+from .jobs import enqueue_sync
+from .leader import FENCE_NS, UNIT_NS
+from .parser import OPS_BY_KEY, split_address
+from .textnorm import normalize_key
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+CHANGE_LOG_RETENTION_DAYS = int(os.getenv("CHANGE_LOG_RETENTION_DAYS", "7"))
+# monthly incident_history partitions older than this are dropped; incident_daily_stats keeps their totals
+HISTORY_KEEP_MONTHS = int(os.getenv("HISTORY_KEEP_MONTHS", "24"))
+# incident_daily_stats days are local days
+TZ = zoneinfo.ZoneInfo(os.getenv("APP_TZ", "Europe/Belgrade"))
+
+HISTORY_COLS = ("id", "source", "source_url", "title", "description", "address_text", "starts_at",
+                "ends_at", "dedupe_hash", "lat", "lon", "created_at")
 def get_conn():
     return psycopg.connect(DATABASE_URL)
 
@@ -26,25 +35,225 @@ def save_cache(url: str, etag: str | None, last_modified: str | None, content_ha
         """, (url, etag, last_modified, content_hash))
         conn.commit()
 
-def upsert_incident(src: str, src_url: str, title: str, description: str, address_text: str | None, lat: float | None, lon: float | None):
-    import hashlib
+def dedupe_hash(src: str, title: str, address_text: str | None) -> str:
     key = f"{src}|{title}|{address_text or ''}"
-    dh = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def load_source_items(src: str) -> dict[str, tuple[str | None, bool]]:
+    """dedupe_hash -> (description, has coordinates) for every live incident of a source."""
     with get_conn() as conn, conn.cursor() as cur:
         cur.execute("""
-        INSERT INTO incident (
-            source, source_url, title, description,
-            address_text, dedupe_hash, lat, lon, seen
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (dedupe_hash)
-        DO UPDATE SET
-            description = EXCLUDED.description,
-            updated_at = now(),
-            seen = True
-        RETURNING (xmax = 0) AS inserted
-        """, (src, src_url, title, description, address_text, dh, lat, lon, True))
-
-        inserted = cur.fetchone()[0]
+            SELECT dedupe_hash, description, lat IS NOT NULL AND lon IS NOT NULL
+            FROM incident WHERE source = %s AND dedupe_hash IS NOT NULL
+        """, (src,))
+        return {dh: (desc, located) for dh, desc, located in cur.fetchall()}
+
+def diff_source_items(src: str, items: list[dict], existing: dict[str, tuple[str | None, bool]]):
+    """
+    Split freshly parsed items against what the table holds for the source:
+      added    - new (title, address): geocode, insert, notify
+      changed  - same (title, address), new description: update only
+      unplaced - stored without coordinates: geocode again (the geocode cache
+                 rate-limits retries through its negative TTL)
+      removed  - dedupe hashes no longer in the bulletin
+    Unchanged items appear in none of them.
+    """
+    current = {}
+    for it in items:
+        current.setdefault(dedupe_hash(src, it["title"], it["address_text"]), it)
+    added, changed, unplaced = [], [], []
+    for dh, it in current.items():
+        if dh not in existing:
+            added.append(it)
+        elif not existing[dh][1]:
+            unplaced.append(it)
+        elif existing[dh][0] != it["description"]:
+            changed.append(it)
+    removed = [dh for dh in existing if dh not in current]
+    return added, changed, unplaced, removed
+
+class LeaseLost(Exception):
+    """The run's fencing token no longer leads its unit; nothing was written."""
+
+def check_fence(cur, fence: tuple[int, int]):
+    """
+    Inside a write transaction: hold the unit's fence lock until commit, then
+    check that the lock session `fence` names (Leases.fence) still leads the
+    unit. A replica that lost its lease mid-run cannot write, and a new leader
+    waits for the fence before it starts. Raises LeaseLost.
+    """
+    key, pid = fence
+    cur.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", (FENCE_NS, key))
+    if cur.fetchone()[0]:
+        cur.execute("""
+            SELECT EXISTS (SELECT 1 FROM pg_locks
+                           WHERE locktype = 'advisory' AND granted AND pid = %s
+                             AND classid = %s::oid AND objid = %s::int4::oid AND objsubid = 2
+                             AND database = (SELECT oid FROM pg_database WHERE datname = current_database()))
+        """, (pid, UNIT_NS, key))
+        if cur.fetchone()[0]:
+            return
+    raise LeaseLost(f"lease {key} is no longer held by lock session {pid}")
+
+def apply_source_diff(src: str, src_url: str, upserts: list[dict], removed: list[str],
+                      fence: tuple[int, int] | None = None) -> tuple[list[dict], int, int]:
+    """
+    Write one source's diff in a single transaction:
+      - COPY upserts into a temp stage table, one INSERT ... ON CONFLICT
+        (coordinates left as NULL keep the stored ones)
+      - move the removed dedupe hashes to incident_history (archive_removed)
+      - queue one notify_incidents job for the inserted rows, so subscribers
+        are matched and mailed even if the worker dies right after the commit
+    upserts: dicts with title, description, address_text, lat, lon.
+    fence: Leases.fence token of the source's unit; checked first (check_fence).
+    Returns (inserted items, updated count, archived count).
+    """
+    by_hash = {}
+    for it in upserts:
+        by_hash.setdefault(dedupe_hash(src, it["title"], it["address_text"]), it)
+
+    written, deleted = [], 0
+    with get_conn() as conn, conn.cursor() as cur:
+        if fence is not None:
+            check_fence(cur, fence)
+        if by_hash:
+            cur.execute("""
+                CREATE TEMP TABLE incident_stage (
+                    dedupe_hash TEXT PRIMARY KEY, title TEXT, description TEXT,
+                    address_text TEXT, lat DOUBLE PRECISION, lon DOUBLE PRECISION
+                ) ON COMMIT DROP
+            """)
+            with cur.copy("COPY incident_stage (dedupe_hash, title, description, address_text, lat, lon) FROM STDIN") as cp:
+                for dh, it in by_hash.items():
+                    cp.write_row((dh, it["title"], it["description"], it["address_text"], it.get("lat"), it.get("lon")))
+
+            cur.execute("""
+                INSERT INTO incident (source, source_url, title, description, address_text, dedupe_hash, lat, lon)
+                SELECT %s, %s, title, description, address_text, dedupe_hash, lat, lon
+                FROM incident_stage
+                ON CONFLICT (dedupe_hash) DO UPDATE SET
+                    description = EXCLUDED.description,
+                    lat = coalesce(EXCLUDED.lat, incident.lat),
+                    lon = coalesce(EXCLUDED.lon, incident.lon),
+                    updated_at = now()
+                WHERE (incident.description, incident.lat, incident.lon)
+                      IS DISTINCT FROM (EXCLUDED.description, coalesce(EXCLUDED.lat, incident.lat), coalesce(EXCLUDED.lon, incident.lon))
+                RETURNING dedupe_hash, (xmax = 0) AS inserted, id
+            """, (src, src_url))
+            written = cur.fetchall()
+            new_ids = [id_ for _, is_new, id_ in written if is_new]
+            if new_ids:
+                enqueue_sync(cur, "notify_incidents", {"incident_ids": new_ids})
+
+        if removed:
+            deleted = archive_removed(cur, src, removed)
+        conn.commit()
+
+    inserted = [by_hash[dh] for dh, is_new, _ in written if is_new]
+    return inserted, len(written) - len(inserted), deleted
+
+def _month_start(year: int, month: int) -> datetime:
+    return datetime(year + (month - 1) // 12, (month - 1) % 12 + 1, 1, tzinfo=timezone.utc)
+
+def ensure_history_partition(cur, ts: datetime):
+    """Create the incident_history partition holding `ts` (UTC calendar month) if it is missing."""
+    ts = ts.astimezone(timezone.utc)
+    name = f"incident_history_p{ts.year:04d}{ts.month:02d}"
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+    if cur.fetchone()[0]:
+        return
+    # concurrent sources may race for the same new month
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('incident_history_partitions'))")
+    lo, hi = _month_start(ts.year, ts.month), _month_start(ts.year, ts.month + 1)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {name} PARTITION OF incident_history
+        FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')
+    """)
+
+def archive_removed(cur, src: str, removed: list[str]) -> int:
+    """
+    Move incidents that left the bulletin from incident to incident_history and
+    add them to incident_daily_stats, inside the caller's transaction. The delete
+    still reaches API clients through the incident_change tombstone.
+    """
+    cur.execute(f"""
+        DELETE FROM incident WHERE source = %s AND dedupe_hash = ANY(%s)
+        RETURNING {', '.join(HISTORY_COLS)}, now()
+    """, (src, removed))
+    rows = cur.fetchall()
+    if not rows:
+        return 0
+    resolved_at = rows[0][-1]
+    ensure_history_partition(cur, resolved_at)
+
+    day = resolved_at.astimezone(TZ).date()
+    daily = defaultdict(lambda: [0, 0.0])
+    i_addr, i_created = HISTORY_COLS.index("address_text"), HISTORY_COLS.index("created_at")
+    with cur.copy(f"COPY incident_history ({', '.join(HISTORY_COLS)}, opstina, resolved_at) FROM STDIN") as cp:
+        for r in rows:
+            opstina = OPS_BY_KEY.get(normalize_key(split_address(r[i_addr])[0]))
+            cp.write_row((*r[:-1], opstina, resolved_at))
+            agg = daily[opstina or ""]
+            agg[0] += 1
+            if r[i_created] is not None:
+                agg[1] += max(0.0, (resolved_at - r[i_created]).total_seconds())
+    cur.executemany("""
+        INSERT INTO incident_daily_stats (day, opstina, source, resolved, duration_seconds)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (day, opstina, source) DO UPDATE SET
+            resolved = incident_daily_stats.resolved + EXCLUDED.resolved,
+            duration_seconds = incident_daily_stats.duration_seconds + EXCLUDED.duration_seconds
+    """, [(day, opstina, src, n, secs) for opstina, (n, secs) in daily.items()])
+    return len(rows)
+
+def maintain_history_partitions(months_ahead: int = 1, keep_months: int = HISTORY_KEEP_MONTHS) -> list[str]:
+    """
+    Pre-create this month's and the next months_ahead partitions (so archiving
+    never has to run DDL) and drop partitions wholly older than keep_months.
+    Returns the dropped partition names.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = _month_start(now.year, now.month - keep_months)
+    dropped = []
+    with get_conn() as conn, conn.cursor() as cur:
+        for k in range(months_ahead + 1):
+            ensure_history_partition(cur, _month_start(now.year, now.month + k))
+        cur.execute("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'incident_history'::regclass
+        """)
+        for (name,) in cur.fetchall():
+            suffix = name.rsplit("_p", 1)[-1]
+            if not (len(suffix) == 6 and suffix.isdigit()):
+                continue
+            if _month_start(int(suffix[:4]), int(suffix[4:])) < cutoff:
+                cur.execute(f'DROP TABLE IF EXISTS "{name}"')
+                dropped.append(name)
+        conn.commit()
+    if dropped:
+        logging.info(f"[history] dropped partitions {', '.join(dropped)}")
+    return dropped
+
+def prune_change_log(days: int = CHANGE_LOG_RETENTION_DAYS) -> int:
+    """Drop incident_change rows older than `days`; clients further behind get a reset snapshot."""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            WITH gone AS (
+                DELETE FROM incident_change WHERE changed_at < now() - make_interval(days => %s) RETURNING xid
+            ), mark AS (
+                INSERT INTO incident_change_pruned (id, xid)
+                SELECT true, max(xid) FROM gone HAVING count(*) > 0
+                ON CONFLICT (id) DO UPDATE SET xid = greatest(incident_change_pruned.xid, EXCLUDED.xid)
+            )
+            SELECT count(*) FROM gone
+        """, (days,))
+        n = cur.fetchone()[0]
+        conn.commit()
+        return n
+
+def notify_incident_changes():
+    """NOTIFY API listeners (SSE clients, response caches) with the change-log head."""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_notify('incident_changes', incident_change_head()::text)")
         conn.commit()
-        return inserted
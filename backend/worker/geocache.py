@@ -0,0 +1,189 @@
+# backend/worker/geocache.py
+import os, logging, threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+import cyrtranslit
+
+from .dbio import get_conn
+from .scrape import geocode_remote
+from .textnorm import normalize_key, clean_address
+from . import metrics
+
+LRU_SIZE = int(os.getenv("GEOCODE_LRU_SIZE", "5000"))
+NEGATIVE_TTL_HOURS = int(os.getenv("GEOCODE_NEGATIVE_TTL_HOURS", "72"))
+MAX_WORKERS = int(os.getenv("GEOCODE_MAX_WORKERS", "8"))
+
+Coords = tuple[float | None, float | None]
+_MISS = (None, None)
+
+class GeocodeUnavailable(Exception):
+    """Geoapify failed transiently (timeout, 5xx) for some addresses of a strict lookup."""
+
+class GeocodeCache:
+    """
+    Two-level cache in front of Geoapify:
+      1) in-process LRU (key -> (lat, lon))
+      2) Postgres geocode_cache table, shared by the API and the worker
+    Keys are normalize_key(address), so Cyrillic and Latin spellings share an entry.
+    Negative answers are cached in the DB only and expire after NEGATIVE_TTL_HOURS.
+    """
+
+    def __init__(self, size: int = LRU_SIZE):
+        self.size = size
+        self._lru: OrderedDict[str, Coords] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"lru_hits": 0, "db_hits": 0, "misses": 0, "api_calls": 0, "api_errors": 0}
+
+    # ---- LRU ----
+    def _lru_get(self, key: str) -> Coords | None:
+        with self._lock:
+            val = self._lru.get(key)
+            if val is not None:
+                self._lru.move_to_end(key)
+            return val
+
+    def _lru_put(self, key: str, val: Coords):
+        with self._lock:
+            self._lru[key] = val
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.size:
+                self._lru.popitem(last=False)
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.stats[name] += n
+        if n:
+            metrics.GEOCODE_LOOKUPS.labels(name).inc(n)
+
+    # ---- DB ----
+    def _db_get_many(self, keys: list[str]) -> dict[str, Coords]:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT key, lat, lon FROM geocode_cache
+                WHERE key = ANY(%s)
+                  AND (found OR updated_at > now() - make_interval(hours => %s))
+            """, (keys, NEGATIVE_TTL_HOURS))
+            return {k: (lat, lon) for k, lat, lon in cur.fetchall()}
+
+    def _db_put_many(self, rows: list[tuple[str, str, float | None, float | None]]):
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.executemany("""
+                INSERT INTO geocode_cache(key, query, lat, lon, found, updated_at)
+                VALUES (%s, %s, %s, %s, %s, now())
+                ON CONFLICT (key) DO UPDATE SET query=EXCLUDED.query, lat=EXCLUDED.lat, lon=EXCLUDED.lon,
+                                                found=EXCLUDED.found, updated_at=now()
+            """, [(k, q, lat, lon, lat is not None and lon is not None) for k, q, lat, lon in rows])
+            conn.commit()
+
+    # ---- API ----
+    def _remote(self, query: str) -> Coords | None:
+        self._count("api_calls")
+        try:
+            return geocode_remote(query)
+        except Exception as e:
+            # transient: don't cache, next scrape retries
+            self._count("api_errors")
+            logging.warning(f"[geocode] failed for '{query}': {e}")
+            return None
+
+    def geocode_many(self, addresses: Iterable[str], max_workers: int = MAX_WORKERS,
+                     strict: bool = False) -> dict[str, Coords]:
+        """
+        Resolve a batch of addresses; returns {address: (lat, lon)} for every input.
+        Unique keys are looked up LRU → one DB query → concurrent Geoapify calls.
+        A transient API failure reads as (None, None), or with strict=True raises
+        GeocodeUnavailable (after caching the answers that did come back), so a
+        job can retry instead of storing the gap.
+        """
+        addresses = list(addresses)
+        by_key: dict[str, str] = {}
+        for a in addresses:
+            if a and a.strip():
+                by_key.setdefault(normalize_key(a), a.strip())
+        by_key.pop("", None)
+
+        resolved: dict[str, Coords] = {}
+        missing = []
+        for key in by_key:
+            val = self._lru_get(key)
+            if val is not None:
+                resolved[key] = val
+            else:
+                missing.append(key)
+        self._count("lru_hits", len(resolved))
+
+        if missing:
+            try:
+                found = self._db_get_many(missing)
+            except Exception as e:
+                logging.warning(f"[geocode] cache table unavailable: {e}")
+                found = {}
+            self._count("db_hits", len(found))
+            for key, val in found.items():
+                resolved[key] = val
+                if val[0] is not None:
+                    self._lru_put(key, val)
+            missing = [k for k in missing if k not in found]
+
+        if missing:
+            self._count("misses", len(missing))
+            queries = [by_key[k] for k in missing]
+            workers = max(1, min(max_workers, len(queries)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                answers = list(pool.map(self._remote, queries))
+            to_store, failed = [], []
+            for key, query, val in zip(missing, queries, answers):
+                if val is None:
+                    resolved[key] = _MISS
+                    failed.append(query)
+                    continue
+                resolved[key] = val
+                if val[0] is not None:
+                    self._lru_put(key, val)
+                to_store.append((key, query, val[0], val[1]))
+            if to_store:
+                try:
+                    self._db_put_many(to_store)
+                except Exception as e:
+                    logging.warning(f"[geocode] could not persist {len(to_store)} answers: {e}")
+            if strict and failed:
+                raise GeocodeUnavailable(f"{len(failed)} of {len(queries)} lookups failed, e.g. '{failed[0]}'")
+
+        out: dict[str, Coords] = {}
+        for a in addresses:
+            out[a] = resolved.get(normalize_key(a), _MISS) if a else _MISS
+        return out
+
+    def geocode(self, address: str, strict: bool = False) -> Coords:
+        if not address or not address.strip():
+            return _MISS
+        return self.geocode_many([address], strict=strict)[address]
+
+    def hit_rate(self) -> float:
+        s = self.stats
+        hits = s["lru_hits"] + s["db_hits"]
+        total = hits + s["misses"]
+        return hits / total if total else 0.0
+
+_cache = GeocodeCache()
+
+def geocode_cached(address: str, strict: bool = False) -> Coords:
+    return _cache.geocode(address, strict=strict)
+
+def geocode_many(addresses: Iterable[str], max_workers: int = MAX_WORKERS, strict: bool = False) -> dict[str, Coords]:
+    return _cache.geocode_many(addresses, max_workers=max_workers, strict=strict)
+
+def geocode_stats() -> dict:
+    return {**_cache.stats, "hit_rate": round(_cache.hit_rate(), 4), "lru_size": len(_cache._lru)}
+
+def geocode_user_addresses(addresses: Iterable[str] | None, strict: bool = False) -> tuple[list, list]:
+    """
+    Coordinates for a subscriber's addressOfUser, as parallel (lats, lons) lists
+    ready for the "user".addressLat / addressLon columns (None where unresolved).
+    strict: raise GeocodeUnavailable rather than return a transient failure as None.
+    """
+    queries = [cyrtranslit.to_cyrillic(clean_address(a)) for a in (addresses or [])]
+    coords = geocode_many((q for q in queries if q), strict=strict)
+    pts = [coords.get(q, _MISS) if q else _MISS for q in queries]
+    return [p[0] for p in pts], [p[1] for p in pts]
@@ -0,0 +1,188 @@
+# backend/worker/jobs.py
+import asyncio, json, logging, os, random, time
+from typing import Awaitable, Callable, Dict
+
+import asyncpg
+
+from . import metrics
+
+JOBS_CHANNEL = "jobs"
+JOBS_CONCURRENCY = int(os.getenv("JOBS_CONCURRENCY", "4"))
+JOBS_BATCH = int(os.getenv("JOBS_BATCH", "20"))
+JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", "10"))
+JOBS_BACKOFF_SECONDS = float(os.getenv("JOBS_BACKOFF_SECONDS", "15"))
+# a 'running' row this old belongs to a worker that died mid-job
+JOBS_STALE_MINUTES = int(os.getenv("JOBS_STALE_MINUTES", "15"))
+# finished rows are kept this long for inspection
+JOBS_KEEP_DAYS = int(os.getenv("JOBS_KEEP_DAYS", "7"))
+
+JOB_RESULTS = metrics.metric(metrics.Counter, "h2o_jobs_total", "Background jobs by kind and outcome",
+                             ["kind", "result"])
+
+Handler = Callable[[asyncpg.Pool, dict], Awaitable[None]]
+HANDLERS: Dict[str, Handler] = {}
+
+def handler(kind: str):
+    """Decorator: run the decorated coroutine fn(pool, payload) for jobs of this kind."""
+    def deco(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return deco
+
+# ---- producer side (API and worker, asyncpg) ----
+
+async def enqueue(conn, kind: str, payload: dict | None = None, dedupe_key: str | None = None,
+                  delay_seconds: float = 0, max_attempts: int = 5) -> int | None:
+    """
+    Add a job and wake the workers. Returns the job id, or None when a job with
+    the same dedupe_key is still pending (it reads current data when it runs; the
+    key is released once a worker claims the job). Inside a transaction the job
+    and the wake-up only become visible on commit.
+    """
+    job_id = await conn.fetchval("""
+        INSERT INTO job_queue (kind, payload, dedupe_key, run_at, max_attempts)
+        VALUES ($1, $2::jsonb, $3, now() + make_interval(secs => $4), $5)
+        ON CONFLICT (dedupe_key) DO NOTHING
+        RETURNING id
+    """, kind, json.dumps(payload or {}), dedupe_key, float(delay_seconds), max_attempts)
+    if job_id is not None:
+        await conn.execute("SELECT pg_notify($1, $2)", JOBS_CHANNEL, kind)
+    return job_id
+
+def enqueue_sync(cur, kind: str, payload: dict | None = None, dedupe_key: str | None = None,
+                 delay_seconds: float = 0, max_attempts: int = 5) -> int | None:
+    """enqueue() for a psycopg cursor (worker.dbio), inside the caller's transaction."""
+    cur.execute("""
+        INSERT INTO job_queue (kind, payload, dedupe_key, run_at, max_attempts)
+        VALUES (%s, %s::jsonb, %s, now() + make_interval(secs => %s), %s)
+        ON CONFLICT (dedupe_key) DO NOTHING
+        RETURNING id
+    """, (kind, json.dumps(payload or {}), dedupe_key, float(delay_seconds), max_attempts))
+    row = cur.fetchone()
+    if row is not None:
+        cur.execute("SELECT pg_notify(%s, %s)", (JOBS_CHANNEL, kind))
+    return row[0] if row else None
+
+# ---- consumer side (worker) ----
+
+async def _claim(conn, limit: int) -> list[asyncpg.Record]:
+    # a stale job whose last attempt took its worker down is not retried past max_attempts
+    await conn.execute("""
+        UPDATE job_queue
+        SET status = 'failed', locked_at = NULL, finished_at = now(),
+            last_error = coalesce(last_error, 'worker died during the last attempt')
+        WHERE status = 'running' AND locked_at < now() - make_interval(mins => $1)
+          AND attempts >= max_attempts
+    """, JOBS_STALE_MINUTES)
+    return await conn.fetch("""
+        UPDATE job_queue j
+        SET status = 'running', locked_at = now(), attempts = j.attempts + 1, dedupe_key = NULL
+        WHERE j.id IN (
+            SELECT id FROM job_queue
+            WHERE (status = 'pending' AND run_at <= now())
+               OR (status = 'running' AND locked_at < now() - make_interval(mins => $2)
+                   AND attempts < max_attempts)
+            ORDER BY run_at, id
+            LIMIT $1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING j.id, j.kind, j.payload, j.attempts, j.max_attempts
+    """, limit, JOBS_STALE_MINUTES)
+
+def _backoff(attempts: int) -> float:
+    base = JOBS_BACKOFF_SECONDS * (2 ** max(0, attempts - 1))
+    return base * random.uniform(0.8, 1.2)
+
+async def _run_one(pool: asyncpg.Pool, job: asyncpg.Record):
+    kind = job["kind"]
+    fn = HANDLERS.get(kind)
+    try:
+        if fn is None:
+            raise LookupError(f"no handler for job kind {kind!r}")
+        await fn(pool, json.loads(job["payload"]))
+    except Exception as e:
+        give_up = fn is None or job["attempts"] >= job["max_attempts"]
+        err = f"{type(e).__name__}: {e}"
+        await pool.execute("""
+            UPDATE job_queue
+            SET status = $2, last_error = $3, locked_at = NULL,
+                run_at = now() + make_interval(secs => $4),
+                finished_at = CASE WHEN $2 = 'failed' THEN now() END
+            WHERE id = $1
+        """, job["id"], "failed" if give_up else "pending", err, _backoff(job["attempts"]))
+        JOB_RESULTS.labels(kind, "failed" if give_up else "retry").inc()
+        logging.warning(f"[jobs] {kind}#{job['id']} attempt {job['attempts']} failed: {err}")
+        return
+    await pool.execute("""
+        UPDATE job_queue SET status = 'done', finished_at = now(), locked_at = NULL, last_error = NULL
+        WHERE id = $1
+    """, job["id"])
+    JOB_RESULTS.labels(kind, "done").inc()
+
+async def drain_jobs(pool: asyncpg.Pool, concurrency: int = JOBS_CONCURRENCY) -> int:
+    """Run every due job, up to `concurrency` at a time; returns how many ran."""
+    sem = asyncio.Semaphore(concurrency)
+    ran = 0
+
+    async def one(job):
+        async with sem:
+            await _run_one(pool, job)
+
+    while True:
+        async with pool.acquire() as conn:
+            batch = await _claim(conn, JOBS_BATCH)
+        if not batch:
+            return ran
+        await asyncio.gather(*(one(j) for j in batch))
+        ran += len(batch)
+
+async def prune_jobs(pool: asyncpg.Pool, days: int = JOBS_KEEP_DAYS):
+    await pool.execute("""
+        DELETE FROM job_queue WHERE status IN ('done', 'failed') AND finished_at < now() - make_interval(days => $1)
+    """, days)
+
+class JobRunner:
+    """
+    Worker-side loop: drains on every NOTIFY jobs (so API requests see their side
+    effects within milliseconds) and every JOBS_POLL_SECONDS for delayed retries.
+    """
+
+    def __init__(self, concurrency: int = JOBS_CONCURRENCY):
+        self.concurrency = concurrency
+        self.pool: asyncpg.Pool | None = None
+        self._listener: asyncpg.Connection | None = None
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self, dsn: str):
+        self.pool = await asyncpg.create_pool(dsn, min_size=1, max_size=self.concurrency + 2)
+        self._listener = await asyncpg.connect(dsn)
+        await self._listener.add_listener(JOBS_CHANNEL, lambda *_: self._wake.set())
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def _loop(self):
+        while True:
+            t0 = time.perf_counter()
+            try:
+                n = await drain_jobs(self.pool, self.concurrency)
+                if n:
+                    logging.info(f"[jobs] ran {n} in {time.perf_counter() - t0:.2f}s")
+            except Exception as e:
+                logging.warning(f"[jobs] drain failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), JOBS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._listener is not None:
+            await self._listener.close()
+        if self.pool is not None:
+            await self.pool.close()
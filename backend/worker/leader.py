@@ -0,0 +1,179 @@
+# backend/worker/leader.py
+import asyncio, hashlib, logging, math, os, time
+from typing import Callable, Iterable, List
+
+import asyncpg
+
+from . import metrics
+
+# how often held leases are renewed and free ones are tried
+LEADER_RENEW_SECONDS = float(os.getenv("LEADER_RENEW_SECONDS", "5"))
+# Postgres ends a lock session idle this long (a hung replica), which releases its leases
+LEADER_LEASE_SECONDS = float(os.getenv("LEADER_LEASE_SECONDS", "20"))
+WORKER_MAX_REPLICAS = int(os.getenv("WORKER_MAX_REPLICAS", "32"))
+
+# advisory-lock namespaces (first int of the two-int lock form)
+UNIT_NS = 0x48324F01     # 'H2O' + 1: one lock per work unit
+REPLICA_NS = 0x48324F02  # one lock per live replica, for counting them
+FENCE_NS = 0x48324F03    # held by a unit's write transaction (dbio.check_fence)
+
+LEASES_HELD = metrics.metric(metrics.Gauge, "h2o_worker_leases_held", "Work units this replica leads")
+
+def unit_key(name: str) -> int:
+    """Stable int4 lock id for a work unit name."""
+    return int.from_bytes(hashlib.sha1(name.encode()).digest()[:4], "big", signed=True)
+
+class Leases:
+    """
+    Leader election per work unit ('source:BVK', 'maintenance', ...) through
+    session-level Postgres advisory locks on one dedicated connection.
+
+    - Each replica also holds one REPLICA_NS slot lock, so pg_locks tells every
+      replica how many are alive; a replica leads at most ceil(units / replicas)
+      units and drops the surplus, which spreads units across replicas.
+    - The lock session is renewed (queried) every LEADER_RENEW_SECONDS. Postgres
+      drops it after LEADER_LEASE_SECONDS of silence (idle_session_timeout, plus TCP
+      keepalives for a vanished host), so a dead or hung leader's units are taken
+      over within about one lease.
+    - Losing the connection drops every lease at once; listeners hear about each
+      change as fn(unit, held).
+    - A leader can be replaced while still running (a stalled event loop, a
+      partition), so writes carry a fence(unit) token that dbio.check_fence
+      re-checks inside the write transaction. A new leader only starts once no
+      write of the previous one is in flight.
+    """
+
+    def __init__(self, units: Iterable[str] = ()):
+        self.units: List[str] = list(dict.fromkeys(units))
+        self.held: set[str] = set()
+        self.busy: set[str] = set()      # units mid-run; never handed off until they finish
+        self.fencing: set[str] = set()   # locked, waiting for the previous leader's write to finish
+        self.slot: int | None = None
+        self.replicas = 1
+        self.listeners: List[Callable[[str, bool], None]] = []
+        self._dsn: str | None = None
+        self._conn: asyncpg.Connection | None = None
+        self._cooldown: dict[str, float] = {}
+        self._task: asyncio.Task | None = None
+
+    def holds(self, unit: str) -> bool:
+        return unit in self.held
+
+    def fence(self, unit: str) -> tuple[int, int]:
+        """
+        Fencing token for the writes of one run of `unit`: (lock key, pid of the
+        lock session). Taken when the run starts; pid 0 (never a lock holder)
+        when the unit is not led, so every write of that run is refused.
+        """
+        held = unit in self.held and self._conn is not None and not self._conn.is_closed()
+        return unit_key(unit), self._conn.get_server_pid() if held else 0
+
+    async def start(self, dsn: str):
+        self._dsn = dsn
+        try:
+            await self.tick()
+        except Exception as e:
+            logging.warning(f"[leader] first election failed: {e}")
+            await self._drop()
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self._drop()   # closing the session releases every lock
+
+    async def _connect(self):
+        self._conn = await asyncpg.connect(self._dsn, server_settings={
+            "idle_session_timeout": str(int(LEADER_LEASE_SECONDS * 1000)),
+            "tcp_keepalives_idle": str(max(1, int(LEADER_LEASE_SECONDS / 2))),
+            "tcp_keepalives_interval": str(max(1, int(LEADER_LEASE_SECONDS / 6))),
+            "tcp_keepalives_count": "3",
+            "application_name": "h2o-worker-leases",
+        })
+        for i in range(WORKER_MAX_REPLICAS):
+            if await self._conn.fetchval("SELECT pg_try_advisory_lock($1, $2)", REPLICA_NS, i):
+                self.slot = i
+                break
+        else:
+            logging.warning(f"[leader] all {WORKER_MAX_REPLICAS} replica slots taken; counting this one anyway")
+        logging.info(f"[leader] lock session up, replica slot {self.slot}")
+
+    def _set(self, unit: str, held: bool):
+        (self.held.add if held else self.held.discard)(unit)
+        LEASES_HELD.set(len(self.held))
+        logging.info(f"[leader] {'leading' if held else 'released'} {unit}")
+        for fn in self.listeners:
+            try:
+                fn(unit, held)
+            except Exception as e:
+                logging.warning(f"[leader] listener failed: {e}")
+
+    async def _drop(self):
+        for unit in list(self.held):
+            self._set(unit, False)
+        self.fencing.clear()
+        self.slot = None
+        if self._conn is not None:
+            try:
+                await self._conn.close(timeout=2)
+            except Exception:
+                self._conn.terminate()
+            self._conn = None
+
+    async def tick(self):
+        """Renew, rebalance to the fair share, then try the free units."""
+        if self._conn is None or self._conn.is_closed():
+            await self._connect()
+        self.replicas = max(1, await self._conn.fetchval("""
+            SELECT count(*) FROM pg_locks
+            WHERE locktype = 'advisory' AND granted AND classid = $1::oid AND objsubid = 2
+              AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+        """, REPLICA_NS) or 1)
+        fair = math.ceil(len(self.units) / self.replicas)
+        now = time.monotonic()
+        idle = sorted(self.held - self.busy, reverse=True)
+        for unit in idle[:max(0, len(self.held) - fair)]:
+            await self._conn.fetchval("SELECT pg_advisory_unlock($1, $2)", UNIT_NS, unit_key(unit))
+            # let another replica pick it up before we would try again
+            self._cooldown[unit] = now + 3 * LEADER_RENEW_SECONDS
+            self._set(unit, False)
+        for unit in self.units:
+            if len(self.held) + len(self.fencing) >= fair:
+                break
+            if unit in self.held or unit in self.fencing or self._cooldown.get(unit, 0) > now:
+                continue
+            if await self._conn.fetchval("SELECT pg_try_advisory_lock($1, $2)", UNIT_NS, unit_key(unit)):
+                self.fencing.add(unit)
+        for unit in list(self.fencing):
+            # a write transaction of the previous leader holds the fence until it ends;
+            # the xact lock is released again right after this statement
+            if await self._conn.fetchval("SELECT pg_try_advisory_xact_lock($1, $2)", FENCE_NS, unit_key(unit)):
+                self.fencing.discard(unit)
+                self._set(unit, True)
+            else:
+                logging.info(f"[leader] {unit}: previous leader still writing, waiting")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(LEADER_RENEW_SECONDS)
+            try:
+                await asyncio.wait_for(self.tick(), LEADER_RENEW_SECONDS)
+            except Exception as e:
+                logging.warning(f"[leader] lock session lost ({type(e).__name__}: {e}); dropping leases")
+                await self._drop()
+
+    def guard(self, unit: str, fn):
+        """Wrap a scheduled coroutine fn so that only the leader of `unit` runs it."""
+        async def run(*args, **kwargs):
+            if unit in self.held:
+                self.busy.add(unit)
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.busy.discard(unit)
+        run.__name__ = getattr(fn, "__name__", "guarded")
+        return run
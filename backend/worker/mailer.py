@@ -0,0 +1,208 @@
+# backend/worker/mailer.py
+import asyncio, hashlib, logging, os, random, time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import date
+from email.message import EmailMessage
+from typing import Dict, List
+
+import aiosmtplib
+import cyrtranslit
+
+from . import metrics
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_START_TLS = os.getenv("SMTP_START_TLS", "1") == "1"
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_CONCURRENCY = int(os.getenv("SMTP_CONCURRENCY", "8"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "200"))
+# a 'sending' row this old belongs to a worker that died mid-send
+OUTBOX_STALE_MINUTES = int(os.getenv("OUTBOX_STALE_MINUTES", "10"))
+
+SUBJECT = "Nestanak vode u tvojoj prijavljenoj oblasti"
+
+def build_message(incidents: List[Dict]) -> tuple[str, str]:
+    body = "Prijavljeni su novi kvarovi:\n\n"
+    for inc in incidents:
+        body += f"""Lokacija: { cyrtranslit.to_latin(inc.get('address_text') or 'Nepoznata lokacija')}
+Opis: {cyrtranslit.to_latin(inc.get('description') or 'nema opisa')}
+        """
+
+    body += "\nH2O Monitor tim"
+    return SUBJECT, body
+
+def dedupe_key(email: str, incidents: List[Dict], day: str | None = None) -> str:
+    # scoped to the day, so an outage that recurs later is announced again
+    day = day or date.today().isoformat()
+    parts = sorted(f"{inc.get('title') or ''}|{inc.get('address_text') or ''}" for inc in incidents)
+    return hashlib.sha1("\n".join([day, email, *parts]).encode("utf-8")).hexdigest()
+
+@dataclass
+class Outgoing:
+    to: str
+    subject: str
+    body: str
+    id: int | None = None
+    error: str | None = field(default=None, compare=False)
+
+class SmtpPool:
+    """
+    Bounded pool of connected, authenticated aiosmtplib clients.
+    A connection that errors is dropped instead of being returned to the pool.
+    """
+
+    def __init__(self, hostname: str = SMTP_HOST, port: int = SMTP_PORT, username: str | None = None,
+                 password: str | None = None, start_tls: bool = SMTP_START_TLS, size: int = SMTP_POOL_SIZE):
+        self.hostname, self.port, self.start_tls = hostname, port, start_tls
+        self.username = username if username is not None else os.getenv("EMAIL_SENDER")
+        self.password = password if password is not None else os.getenv("EMAIL_PASSWORD")
+        self.sender = self.username or "h2o-monitor@localhost"
+        self.size = size
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(size)
+        self.connects = 0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(hostname=self.hostname, port=self.port,
+                               start_tls=self.start_tls, timeout=SMTP_TIMEOUT)
+        await smtp.connect()
+        if self.username and self.password:
+            await smtp.login(self.username, self.password)
+        self.connects += 1
+        return smtp
+
+    @asynccontextmanager
+    async def connection(self):
+        async with self._slots:
+            smtp = None
+            while not self._idle.empty():
+                cand = self._idle.get_nowait()
+                if cand.is_connected:
+                    smtp = cand
+                    break
+            if smtp is None:
+                smtp = await self._connect()
+            try:
+                yield smtp
+            except Exception:
+                smtp.close()
+                raise
+            self._idle.put_nowait(smtp)
+
+    async def send(self, out: Outgoing):
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = out.to
+        msg["Subject"] = out.subject
+        msg.set_content(out.body)
+        async with self.connection() as smtp:
+            await smtp.send_message(msg)
+
+    async def close(self):
+        while not self._idle.empty():
+            smtp = self._idle.get_nowait()
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+async def deliver(pool: SmtpPool, messages: List[Outgoing], concurrency: int = SMTP_CONCURRENCY) -> List[Outgoing]:
+    """Send messages with at most `concurrency` in flight; returns the ones that failed (error set)."""
+    sem = asyncio.Semaphore(concurrency)
+    failed: List[Outgoing] = []
+
+    async def one(out: Outgoing):
+        async with sem:
+            try:
+                await pool.send(out)
+            except Exception as e:
+                out.error = f"{type(e).__name__}: {e}"
+                failed.append(out)
+
+    await asyncio.gather(*(one(m) for m in messages))
+    return failed
+
+# ---- durable outbox (asyncpg) ----
+
+async def enqueue(conn, batch: Dict[str, List[Dict]]) -> int:
+    """Write one outbox row per recipient; re-enqueueing the same email+incidents is a no-op."""
+    rows = []
+    for email, incidents in batch.items():
+        subject, body = build_message(incidents)
+        rows.append((email, subject, body, dedupe_key(email, incidents)))
+    if not rows:
+        return 0
+    await conn.executemany("""
+        INSERT INTO notification_outbox (email, subject, body, dedupe_key)
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (dedupe_key) DO NOTHING
+    """, rows)
+    return len(rows)
+
+async def _claim(conn, limit: int) -> tuple[List[Outgoing], Dict[int, int]]:
+    rows = await conn.fetch("""
+        UPDATE notification_outbox o
+        SET status = 'sending', locked_at = now(), attempts = o.attempts + 1
+        WHERE o.id IN (
+            SELECT id FROM notification_outbox
+            WHERE (status = 'pending' AND next_attempt_at <= now())
+               OR (status = 'sending' AND locked_at < now() - make_interval(mins => $2))
+            ORDER BY id
+            LIMIT $1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING o.id, o.email, o.subject, o.body, o.attempts
+    """, limit, OUTBOX_STALE_MINUTES)
+    return [Outgoing(r["email"], r["subject"], r["body"], id=r["id"]) for r in rows], {r["id"]: r["attempts"] for r in rows}
+
+def _backoff(attempts: int) -> float:
+    base = OUTBOX_BACKOFF_SECONDS * (2 ** max(0, attempts - 1))
+    return base * random.uniform(0.8, 1.2)
+
+async def drain_outbox(conn, pool: SmtpPool | None = None, concurrency: int = SMTP_CONCURRENCY) -> dict:
+    """
+    Send every due outbox row. Delivery is at-least-once: a crash between the SMTP
+    accept and the 'sent' update re-sends that one message after OUTBOX_STALE_MINUTES;
+    nothing is lost and nothing already marked sent goes out again.
+    """
+    own_pool = pool is None
+    pool = pool or SmtpPool()
+    stats = {"sent": 0, "retry": 0, "failed": 0, "seconds": 0.0}
+    t0 = time.perf_counter()
+    try:
+        while True:
+            batch, attempts = await _claim(conn, OUTBOX_BATCH)
+            if not batch:
+                break
+            failed = await deliver(pool, batch, concurrency)
+            failed_ids = {m.id for m in failed}
+            sent_ids = [m.id for m in batch if m.id not in failed_ids]
+            if sent_ids:
+                await conn.execute("""
+                    UPDATE notification_outbox SET status = 'sent', sent_at = now(), last_error = NULL
+                    WHERE id = ANY($1::bigint[])
+                """, sent_ids)
+                stats["sent"] += len(sent_ids)
+            for m in failed:
+                n = attempts[m.id]
+                give_up = n >= OUTBOX_MAX_ATTEMPTS
+                await conn.execute("""
+                    UPDATE notification_outbox
+                    SET status = $2, last_error = $3, next_attempt_at = now() + make_interval(secs => $4)
+                    WHERE id = $1
+                """, m.id, "failed" if give_up else "pending", m.error, _backoff(n))
+                stats["failed" if give_up else "retry"] += 1
+                logging.warning(f"[mail] {m.to} attempt {n} failed: {m.error}")
+    finally:
+        if own_pool:
+            await pool.close()
+    stats["seconds"] = round(time.perf_counter() - t0, 3)
+    for result in ("sent", "retry", "failed"):
+        if stats[result]:
+            metrics.MAIL_RESULTS.labels(result).inc(stats[result])
+    return stats
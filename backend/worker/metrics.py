@@ -0,0 +1,84 @@
+# backend/worker/metrics.py
+import logging, os
+from contextlib import nullcontext
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram, start_http_server
+except Exception:
+    Counter = Gauge = Histogram = start_http_server = None
+
+from .timing import stages
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+class _Noop:
+    """Stands in for every metric when prometheus_client is not installed."""
+
+    def labels(self, *_a, **_kw):
+        return self
+
+    def inc(self, *_a, **_kw): pass
+    def observe(self, *_a, **_kw): pass
+    def set(self, *_a, **_kw): pass
+    def set_to_current_time(self): pass
+    def set_function(self, _fn): pass
+    def time(self): return nullcontext()
+
+_NOOP = _Noop()
+
+def metric(cls, *args, **kwargs):
+    return cls(*args, **kwargs) if cls is not None else _NOOP
+
+# seconds; scrape stages range from sub-millisecond cache reads to minute-long geocoder batches
+STAGE_BUCKETS = (.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# ---- scraper ----
+SCRAPE_STAGE_SECONDS = metric(Histogram, "h2o_scrape_stage_seconds",
+                              "Wall time of one scrape stage (fetch, extract, parse, geocode, upsert, ...)",
+                              ["stage"], buckets=STAGE_BUCKETS)
+SCRAPE_FETCH_RESPONSES = metric(Counter, "h2o_scrape_fetch_responses_total",
+                                "Source fetches by HTTP status (304 ratio = status=\"304\" / all)",
+                                ["source", "status"])
+SCRAPE_ITEMS = metric(Counter, "h2o_scrape_items_total",
+                      "Parsed items per run, split by diff outcome (parsed, added, changed, unplaced, removed)",
+                      ["source", "kind"])
+SCRAPE_ROWS = metric(Counter, "h2o_scrape_rows_total",
+                     "Incident rows written by the upsert (inserted, updated, deleted)", ["source", "op"])
+SCRAPE_FAILURES = metric(Counter, "h2o_scrape_failures_total",
+                         "Source runs that raised or hit SCRAPE_SOURCE_DEADLINE", ["source"])
+SCRAPE_LAST_SUCCESS = metric(Gauge, "h2o_scrape_last_success_timestamp_seconds",
+                             "Unix time of the last source run that completed", ["source"])
+
+# ---- geocoder cache ----
+GEOCODE_LOOKUPS = metric(Counter, "h2o_geocode_lookups_total",
+                         "Geocode cache outcomes (lru_hits, db_hits, misses, api_calls, api_errors)", ["result"])
+
+# ---- notifier ----
+NOTIFY_MATCH_SECONDS = metric(Histogram, "h2o_notify_match_seconds",
+                              "Time to match a batch of incidents against all subscribers",
+                              buckets=STAGE_BUCKETS)
+NOTIFY_RECIPIENTS = metric(Counter, "h2o_notify_recipients_total",
+                           "Subscribers matched by at least one new incident")
+MAIL_RESULTS = metric(Counter, "h2o_mail_total",
+                      "Outbox deliveries by outcome (sent, retry, failed)", ["result"])
+
+def _observe_stage(name: str, seconds: float):
+    SCRAPE_STAGE_SECONDS.labels(name).observe(seconds)
+
+stages.listeners.append(_observe_stage)
+
+def start_metrics_server(port: int = METRICS_PORT) -> bool:
+    """Serve the default registry on :port/metrics (worker process). False when unavailable."""
+    if start_http_server is None:
+        logging.warning("[metrics] prometheus_client not installed, /metrics disabled")
+        return False
+    if port <= 0:
+        return False
+    try:
+        start_http_server(port)
+    except OSError as e:
+        # e.g. a second worker replica on this host; give each one its own METRICS_PORT
+        logging.warning(f"[metrics] cannot serve on :{port} ({e}); /metrics disabled for this replica")
+        return False
+    logging.info(f"[metrics] serving on :{port}/metrics")
+    return True
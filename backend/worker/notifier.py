@@ -1,123 +1,94 @@
 import asyncio
-from locale import normalize
+import logging
 import os
 import asyncpg
-from dotenv import load_dotenv
-from typing import Dict, List
-from email.message import EmailMessage
-import aiosmtplib
-from geopy.distance import geodesic
-from unidecode import unidecode
-import cyrtranslit
-from typing import Dict, Tuple, Optional
-from geopy.distance import geodesic
-import re
-from pathlib import Path
-
-from worker.scrape import geocode_address
-
-BASE_DIR = Path(__file__).resolve().parents[1]
-load_dotenv(BASE_DIR / ".env")
+from typing import Dict, List, Tuple, TYPE_CHECKING
+
+from worker.geocache import geocode_user_addresses
+from worker.textindex import SubscriberTextIndex
+from worker.mailer import enqueue, drain_outbox
+from worker import metrics
+
+if TYPE_CHECKING:
+    from worker.spatial import PointMatcher   # numpy; imported on first use
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-EMAIL_SENDER = os.getenv("EMAIL_SENDER")
-EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
-
-# asyncio.run(testNot())
-
-async def send_email_to(email: str, incidents: list[dict]):
-    msg = EmailMessage()
-    msg["From"] = EMAIL_SENDER
-    msg["To"] = email
-    msg["Subject"] = "Nestanak vode u tvojoj prijavljenoj oblasti"
-    body = "Prijavljeni su novi kvarovi:\n\n"
-    for inc in incidents:
-        body += f"""Lokacija: { cyrtranslit.to_latin(inc.get('address_text', 'Nepoznata lokacija'))}
-Opis: {cyrtranslit.to_latin(inc.get('description', 'nema opisa'))}
-        """
-
-    body += "\nH2O Monitor tim"
-    msg.set_content(body)
-
-    await aiosmtplib.send(
-        msg,
-        hostname="smtp.gmail.com",
-        port=587,
-        start_tls=True,
-        username=EMAIL_SENDER,
-        password=EMAIL_PASSWORD,
-    )
-
-async def testNot():
-    print("Running testNot")
-
-def incident_matches_user(user: Dict, incident: Dict, threshold_km: float = 0.7) -> bool:
-    address = incident.get("address_text")
-
-    address_norm = normalize(address)
-    area = address_norm.split(",")[0]
-
-    latinArea = cyrtranslit.to_latin(area)
-
-    user_areas = [normalize(a) for a in (user.get("areas") or [])]
-    user_addrs = [normalize(a) for a in (user.get("addressofuser") or [])]
-
-    if latinArea in user_areas or address_norm in user_addrs:
-        return True
-    
-    if incident.get("lat") and incident.get("lon"):
-
-        for addr_text in user.get("addressofuser", []):
-            if not addr_text:
-                continue
-
-            addr_text = str(addr_text).strip().strip("{}\"' ")
-            addr_text = addr_text.replace("\n", " ").strip()
-            
-            cyrilic_addr = cyrtranslit.to_cyrillic(addr_text)   
-
-            lat_user = lon_user = None
-            lat, lon = geocode_address(cyrilic_addr)
-            if lat is not None and lon is not None:
-                lat_user, lon_user = lat, lon
-                
-
-            # print(lat_user, lon_user)
-            # print(float(incident["lat"]), float(incident["lon"]))
-            dist = geodesic(
-                (float(incident["lat"]), float(incident["lon"])),
-                (lat_user, lon_user)
-            ).km
-            if dist <= threshold_km:
-                return True
-    return False
-
-
-async def notify_users_about_incidents(incidents: List[Dict]):
+
+THRESHOLD_KM = 0.7
+
+def user_points(user: Dict) -> List[Tuple[float, float]]:
+    """Precomputed (lat, lon) of a subscriber's addresses, skipping unresolved ones."""
+    lats = user.get("addresslat") or []
+    lons = user.get("addresslon") or []
+    return [(la, lo) for la, lo in zip(lats, lons) if la is not None and lo is not None]
+
+def build_point_matcher(users: List[Dict]) -> "PointMatcher":
+    # numpy loads with the first notify batch, not with the worker
+    from worker.spatial import PointMatcher
+    owners, lats, lons = [], [], []
+    for i, u in enumerate(users):
+        for lat, lon in user_points(u):
+            owners.append(i)
+            lats.append(lat)
+            lons.append(lon)
+    return PointMatcher(owners, lats, lons)
+
+def match_incidents(users: List[Dict], incidents: List[Dict], threshold_km: float = THRESHOLD_KM) -> Dict[str, List[Dict]]:
+    """
+    email -> matched incidents (in input order) for the whole batch.
+    Distance matching is one vectorized haversine pass (see worker.spatial for
+    the tolerance vs. geodesic); area/address matching goes through the
+    inverted SubscriberTextIndex.
+    """
+    matcher = build_point_matcher(users)
+    located = [i for i, inc in enumerate(incidents) if inc.get("lat") and inc.get("lon")]
+    near_by_incident: Dict[int, set] = {}
+    if located and len(matcher):
+        near = matcher.match(
+            [float(incidents[i]["lat"]) for i in located],
+            [float(incidents[i]["lon"]) for i in located],
+            threshold_km,
+        )
+        near_by_incident = {i: set(owners.tolist()) for i, owners in zip(located, near)}
+
+    text_hits = SubscriberTextIndex(users).lookup_many(incidents)
+
+    matched: Dict[str, List[Dict]] = {}
+    for j, inc in enumerate(incidents):
+        for i in sorted(text_hits[j] | near_by_incident.get(j, set())):
+            matched.setdefault(users[i]["email"], []).append(inc)
+    return matched
+
+async def backfill_user_coords(conn, users: List[Dict]):
+    """Geocode (via the cache) subscribers saved before addressLat/addressLon existed."""
+    stale = [u for u in users
+             if u.get("addressofuser") and len(u.get("addresslat") or []) != len(u["addressofuser"])]
+    for u in stale:
+        lats, lons = await asyncio.to_thread(geocode_user_addresses, u["addressofuser"])
+        await conn.execute(
+            'UPDATE "user" SET addressLat = $1, addressLon = $2 WHERE id = $3',
+            lats, lons, u["id"],
+        )
+        u["addresslat"], u["addresslon"] = lats, lons
+
+USER_COLUMNS = 'id, email, areas, addressOfUser, addressLat, addressLon'
+
+async def notify_users_about_incidents(incidents: List[Dict], threshold_km: float = THRESHOLD_KM) -> Dict[str, List[Dict]]:
     if not incidents:
-        return
+        return {}
 
     conn = await asyncpg.connect(DATABASE_URL)
     try:
-        users = await conn.fetch("SELECT email, areas, addressOfUser FROM \"user\"")
-        users_to_notify = {}
-
-        for user in users:
-            user_obj = {
-                "email": user["email"],
-                "areas": user["areas"],
-                "addressofuser": user["addressofuser"]
-            }
-
-            matched = []
-            for inc in incidents:
-                if incident_matches_user(user_obj, inc):
-                    matched.append(inc)
-
-            if matched:
-                users_to_notify[user["email"]] = matched
-        for email, matched_incidents in users_to_notify.items():
-            await send_email_to(email, matched_incidents)
+        users = [dict(u) for u in await conn.fetch(f'SELECT {USER_COLUMNS} FROM "user"')]
+        await backfill_user_coords(conn, users)
+        with metrics.NOTIFY_MATCH_SECONDS.time():
+            users_to_notify = match_incidents(users, incidents, threshold_km)
+        metrics.NOTIFY_RECIPIENTS.inc(len(users_to_notify))
+
+        await enqueue(conn, users_to_notify)
+        stats = await drain_outbox(conn)
+        logging.info(f"[notify] matched={len(users_to_notify)} mail={stats}")
+        return users_to_notify
 
     finally:
         await conn.close()
@@ -128,20 +99,26 @@ async def notify_newUser_about_incidents(email: str, incidents: List[Dict]):
 
     conn = await asyncpg.connect(DATABASE_URL)
     try:
-        user = await conn.fetchrow("SELECT areas, addressOfUser FROM \"user\" where email = email")
-
-        user_obj = {
-            "email": email,
-            "areas": user["areas"],
-            "addressofuser": user["addressofuser"]
-        }
-        matched = []
-        for inc in incidents:
-            if incident_matches_user(user_obj, inc):
-                matched.append(inc)
+        row = await conn.fetchrow(f'SELECT {USER_COLUMNS} FROM "user" WHERE email = $1', email)
+        if not row:
+            return
+        user_obj = dict(row)
+        await backfill_user_coords(conn, [user_obj])
 
+        matched = match_incidents([user_obj], incidents).get(email)
         if matched:
-            await send_email_to(email, matched)
+            await enqueue(conn, {email: matched})
+            await drain_outbox(conn)
 
     finally:
         await conn.close()
+
+async def drain_pending_mail():
+    """Retry outbox rows left pending by earlier failures (scheduled job)."""
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        stats = await drain_outbox(conn)
+        if stats["sent"] or stats["retry"] or stats["failed"]:
+            logging.info(f"[mail] outbox drain {stats}")
+    finally:
+        await conn.close()
@@ -1,5 +1,7 @@
-from typing import List, Dict
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List
 import re
+from .textnorm import normalize_key
 
 OPS = [
     "Стари град","Савски венац","Врачар","Звездара","Палилула","Вождовац",
@@ -7,8 +9,15 @@ OPS = [
     "Сурчин","Сопот","Младеновац","Обреновац","Лазаревац"
 ]
 
+# normalize_key(municipality) -> Cyrillic name; 'Novi Beograd' and 'Нови Београд' share a key
+OPS_BY_KEY = {normalize_key(o): o for o in OPS}
+
 TIME_RE = re.compile(r"До\s+(\d{1,2})[:.](\d{2})", flags=re.U | re.I)
 OPS_RE = re.compile(r"(?P<opstina>" + "|".join(map(re.escape, OPS)) + r")\s*:\s*", flags=re.U)
+# one scanner for the whole bulletin: a municipality header or an address separator
+TOKEN_RE = re.compile(OPS_RE.pattern + r"|,\s*", flags=re.U)
+SHARE_RE = re.compile(r"(Подели\s+садржај.*)$", flags=re.U | re.I)
+EDGE_CHARS = " ,;–-"
 
 # markers where to stop
 STOP_MARKERS = [
@@ -16,8 +25,14 @@ STOP_MARKERS = [
     "Подели садржај", "Подели на", "Share on", "Podeli",  # share widgets (various langs)
 ]
 
+def split_address(address_text: str | None) -> tuple[str, str]:
+    """'Звездара, Булевар краља Александра 73' -> ('Звездара', 'Булевар краља Александра 73')"""
+    opst, _, street = (address_text or "").partition(",")
+    return opst.strip(), street.strip()
+
 def _normalize(s: str) -> str:
-    return re.sub(r"\s+", " ", s).strip()
+    # same result as re.sub(r"\s+", " ", s).strip(): str.split() and re's \s share one notion of whitespace
+    return " ".join(s.split())
 
 def _clip_bvk_region(full: str) -> str:
     """
@@ -38,48 +53,66 @@ def _clip_bvk_region(full: str) -> str:
         start_idx = 0  # fallback
 
     # find stop
-    stops = [s.find(k) for k in STOP_MARKERS if s.find(k) != -1]
+    stops = [i for i in (s.find(k) for k in STOP_MARKERS) if i != -1]
     stop_idx = min(stops) if stops else len(s)
 
     clipped = s[start_idx:stop_idx]
     # remove “share” fragments that slipped through
-    clipped = re.sub(r"(Подели\s+садржај.*)$", "", clipped, flags=re.U | re.I)
-    return clipped.strip(" ,;–-")
+    clipped = SHARE_RE.sub("", clipped)
+    return clipped.strip(EDGE_CHARS)
 
-def parse_bvk(text: str) -> List[Dict]:
-    s = re.sub(r"\s+", " ", text).strip()
+# ---- parser registry ----
+
+PARSERS: Dict[str, Callable[[str], Iterable[Dict]]] = {}
+
+def register(source_name: str):
+    """Decorator: route parse(source_name, text) to the decorated function."""
+    def deco(fn):
+        PARSERS[source_name] = fn
+        return fn
+    return deco
+
+# ---- BVK ----
+
+def iter_bvk(text: str) -> Iterator[Dict]:
+    """
+    Single pass over the bulletin: TOKEN_RE yields municipality headers and commas,
+    and the text between two tokens is one address of the current municipality.
+    """
+    s = _normalize(text)
 
     mtime = TIME_RE.search(s)
-    until = f"{mtime.group(1).zfill(2)}:{mtime.group(2)}" if mtime else None
-
-    items: List[Dict] = []
-    matches = list(OPS_RE.finditer(s))
-    if not matches:
-        return items
-
-    for i, m in enumerate(matches):
-        opst = m.group("opstina")
-        start = m.end()
-        end = matches[i + 1].start() if i + 1 < len(matches) else len(s)
-        seg = s[start:end].strip(" ,;–-")
-
-        addrs = [a.strip(" ,;–-") for a in re.split(r",\s*", seg) if a.strip()]
-        for addr in addrs:
-            # " - " into a comma
-            addr = re.sub(r"\s+–\s+", ", ", addr)
-            addr = re.sub(r"\s+-\s+", ", ", addr)
-            addr = re.sub(r"\s{2,}", " ", addr).strip(" ,;–-")
-
-            title = f"{opst}: {addr}"
-            desc = f"До {until} — {title}" if until else title
-            items.append({
-                "title": title,
-                "description": desc,
-                "address_text": f"{opst}, {addr}",
-            })
-    return items
+    prefix = f"До {mtime.group(1).zfill(2)}:{mtime.group(2)} — " if mtime else ""
+
+    opst = None
+    pos = 0
+    started = False   # a real address was seen in this municipality
+    held = 0          # separator-only pieces ("-", ";") since the last real address
+    for m in chain(TOKEN_RE.finditer(s), (None,)):
+        if opst is not None:
+            piece = s[pos:m.start() if m is not None else len(s)]
+            if piece and not piece.isspace():
+                # s is whitespace-collapsed, so the old \s+–\s+ / \s+-\s+ subs are plain replaces
+                addr = piece.replace(" – ", ", ").replace(" - ", ", ").strip(EDGE_CHARS)
+                if addr:
+                    for a in [""] * held + [addr]:
+                        title = f"{opst}: {a}"
+                        yield {"title": title, "description": prefix + title, "address_text": f"{opst}, {a}"}
+                    held, started = 0, True
+                else:
+                    # kept as empty addresses only between two real ones, like the
+                    # old split of the edge-stripped segment
+                    held += started
+        if m is None:
+            break
+        if m.lastgroup == "opstina":
+            opst, started, held = m.group("opstina"), False, 0
+        pos = m.end()
+
+@register("BVK")
+def parse_bvk(text: str) -> List[Dict]:
+    return list(iter_bvk(text))
 
 def parse(source_name: str, text: str) -> List[Dict]:
-    if source_name == "BVK":
-        return parse_bvk(text)
-    return []
+    fn = PARSERS.get(source_name)
+    return list(fn(text)) if fn else []
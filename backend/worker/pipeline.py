@@ -0,0 +1,157 @@
+# backend/worker/pipeline.py
+import asyncio, logging, os
+
+import httpx
+
+from .scrape import SOURCES, Source, fetch, section_hash
+from .geocache import geocode_many, geocode_stats
+from .dbio import (load_cache, save_cache, load_source_items, diff_source_items, apply_source_diff,
+                   prune_change_log, notify_incident_changes)
+from .parser import parse
+from .timing import stage
+from . import metrics
+
+SCRAPE_MAX_CONNECTIONS = int(os.getenv("SCRAPE_MAX_CONNECTIONS", "10"))
+# whole fetch → upsert run of one source; a stuck source is abandoned, others carry on
+SCRAPE_SOURCE_DEADLINE = float(os.getenv("SCRAPE_SOURCE_DEADLINE", "600"))
+
+_client: httpx.AsyncClient | None = None
+_source_slots: dict[str, asyncio.Semaphore] = {}
+
+def http_client() -> httpx.AsyncClient:
+    """Shared keep-alive client for every source fetch."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=SCRAPE_MAX_CONNECTIONS,
+                                max_keepalive_connections=SCRAPE_MAX_CONNECTIONS),
+        )
+    return _client
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def _slot(src: Source) -> asyncio.Semaphore:
+    if src.name not in _source_slots:
+        _source_slots[src.name] = asyncio.Semaphore(src.max_concurrency)
+    return _source_slots[src.name]
+
+async def run_source(src: Source, client: httpx.AsyncClient, fence: tuple[int, int] | None = None) -> dict:
+    """
+    fetch → section extraction → parse → geocode → upsert for one source; new
+    incidents are matched and mailed by the notify_incidents job the upsert queues.
+    With a leader `fence` (Leases.fence), the upsert is refused once this replica
+    no longer leads the source.
+    Blocking stages (lxml, psycopg, geocoder threads) run in worker threads, so
+    sources processed together overlap instead of stalling the event loop.
+    """
+    stats = {"source": src.name, "status": None, "inserted": 0, "updated": 0, "deleted": 0,
+             "bytes": 0, "changed": False}
+    async with _slot(src):
+        with stage("load_cache"):
+            cache = await asyncio.to_thread(load_cache, src.url)
+        with stage("fetch"):
+            resp = await fetch(client, src.url, cache.get("etag"), cache.get("last_modified"), src.timeout)
+        stats["status"] = resp.status_code
+        stats["bytes"] = len(resp.content)
+        metrics.SCRAPE_FETCH_RESPONSES.labels(src.name, str(resp.status_code)).inc()
+        if resp.status_code == 304:
+            logging.info(f"[{src.name}] 304 Not Modified")
+            return stats
+        if resp.status_code != 200:
+            logging.warning(f"[{src.name}] HTTP {resp.status_code}")
+            return stats
+
+        new_etag = resp.headers.get("ETag")
+        new_lm   = resp.headers.get("Last-Modified")
+
+        with stage("extract"):
+            h, text, used = await asyncio.to_thread(section_hash, resp.text, src.selector, src.name)
+        logging.info(f"[{src.name}] used={used} html_len={len(resp.text)} section_len={len(text)}")
+        if not h:
+            logging.warning(f"[{src.name}] No date panel found (today). Skipping insert.")
+            return stats
+
+        if h == cache.get("content_hash"):
+            # 200 without a useful validator, same section as last run: nothing downstream to do
+            await asyncio.to_thread(save_cache, src.url, new_etag, new_lm, h)
+            logging.info(f"[{src.name}] section unchanged (hash {h[:10]}), skipped")
+            stats["unchanged"] = True
+            return stats
+        stats["changed"] = True
+
+        with stage("parse"):
+            items = await asyncio.to_thread(parse, src.name, text)
+        rows = [{
+            "title": (it.get("title") or "").strip(),
+            "description": (it.get("description") or "").strip(),
+            "address_text": (it.get("address_text") or "").strip(),
+            "lat": None,
+            "lon": None,
+        } for it in items]
+
+        # only items that are new to the table reach the geocoder / notifier
+        with stage("diff"):
+            existing = await asyncio.to_thread(load_source_items, src.name)
+            added, changed, unplaced, removed = diff_source_items(src.name, rows, existing)
+
+        # one deduplicated, concurrent geocoder batch per source
+        to_place = added + unplaced
+        with stage("geocode"):
+            coords = await asyncio.to_thread(geocode_many, [it["address_text"] for it in to_place])
+        logging.info(f"[{src.name}] items={len(rows)} added={len(added)} changed={len(changed)} "
+                     f"unplaced={len(unplaced)} removed={len(removed)} geocode {geocode_stats()}")
+        for it in to_place:
+            it["lat"], it["lon"] = coords.get(it["address_text"], (None, None))
+        for kind, n in (("parsed", len(rows)), ("added", len(added)), ("changed", len(changed)),
+                        ("unplaced", len(unplaced)), ("removed", len(removed))):
+            metrics.SCRAPE_ITEMS.labels(src.name, kind).inc(n)
+
+        # upsert + retire vanished rows of this source, one transaction
+        with stage("upsert"):
+            new_incidents, updated, deleted = await asyncio.to_thread(
+                apply_source_diff, src.name, src.url, to_place + changed, removed, fence)
+        stats.update(inserted=len(new_incidents), updated=updated, deleted=deleted)
+        for op in ("inserted", "updated", "deleted"):
+            metrics.SCRAPE_ROWS.labels(src.name, op).inc(stats[op])
+
+        # subscribers are matched by the notify_incidents job queued in the same transaction
+
+        await asyncio.to_thread(save_cache, src.url, new_etag, new_lm, h)
+        logging.info(f"[{src.name}] inserted={stats['inserted']} updated={updated} deleted={deleted}")
+        return stats
+
+async def run_scrape_once(sources: list[Source] | None = None,
+                          fences: dict[str, tuple[int, int]] | None = None) -> list[dict]:
+    """
+    All sources concurrently; one failing or slow source never aborts the others.
+    fences: source name -> Leases.fence token, for replicas that split the sources.
+    """
+    sources = SOURCES if sources is None else sources
+    fences = fences or {}
+    client = http_client()
+    results = await asyncio.gather(
+        *(asyncio.wait_for(run_source(src, client, fences.get(src.name)), SCRAPE_SOURCE_DEADLINE)
+          for src in sources),
+        return_exceptions=True,
+    )
+
+    done = []
+    for src, res in zip(sources, results):
+        if isinstance(res, BaseException):
+            logging.error(f"[{src.name}] scrape failed: {type(res).__name__}: {res}")
+            done.append({"source": src.name, "error": repr(res)})
+            metrics.SCRAPE_FAILURES.labels(src.name).inc()
+        else:
+            done.append(res)
+            metrics.SCRAPE_LAST_SUCCESS.labels(src.name).set_to_current_time()
+
+    with stage("publish"):
+        if any(r.get("inserted") or r.get("updated") or r.get("deleted") for r in done):
+            await asyncio.to_thread(notify_incident_changes)
+        await asyncio.to_thread(prune_change_log)
+    return done
@@ -0,0 +1,215 @@
+# backend/worker/polling.py
+import asyncio, logging, os, random, zoneinfo
+from datetime import datetime, timedelta, timezone
+
+from .dbio import get_conn
+from .pipeline import run_scrape_once
+from .scrape import Source
+from .leader import LEADER_RENEW_SECONDS, Leases
+from . import metrics
+
+TZ = zoneinfo.ZoneInfo(os.getenv("APP_TZ", "Europe/Belgrade"))
+POLL_MIN_SECONDS = float(os.getenv("POLL_MIN_SECONDS", "300"))
+POLL_MAX_SECONDS = float(os.getenv("POLL_MAX_SECONDS", "3600"))
+# local hours polled at all, as in the old cron (06:55 → 23:55)
+POLL_HOURS = os.getenv("POLL_HOURS", "6-23")
+# poll once the expected number of section changes since the last poll reaches this
+POLL_TARGET_CHANGES = float(os.getenv("POLL_TARGET_CHANGES", "0.25"))
+# each unchanged poll in a row stretches the next interval by this factor, up to POLL_BACKOFF_MAX
+POLL_BACKOFF = float(os.getenv("POLL_BACKOFF", "1.25"))
+POLL_BACKOFF_MAX = float(os.getenv("POLL_BACKOFF_MAX", "4"))
+POLL_JITTER = float(os.getenv("POLL_JITTER", "0.15"))
+POLL_LEARN_DAYS = int(os.getenv("POLL_LEARN_DAYS", "14"))
+# byte budget per local day, in full (200) responses: the old hourly cron fetched 18 a day
+POLL_DAILY_FULL_FETCHES = float(os.getenv("POLL_DAILY_FULL_FETCHES", "18"))
+# an hour-of-day with no history counts as PRIOR_CHANGES changes over PRIOR_DAYS days
+PRIOR_CHANGES, PRIOR_DAYS = 0.5, 1.0
+
+POLL_INTERVAL = metrics.metric(metrics.Gauge, "h2o_poll_interval_seconds",
+                               "Delay planned before the next poll of a source", ["source"])
+
+def _hours(spec: str) -> set[int]:
+    lo, _, hi = spec.partition("-")
+    return set(range(int(lo), int(hi or lo) + 1))
+
+ACTIVE_HOURS = _hours(POLL_HOURS)
+
+def record_poll(source: str, res: dict, interval: float | None):
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO source_poll_log (source, status, changed, bytes, interval_seconds)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (source, res.get("status"), bool(res.get("changed")), res.get("bytes") or 0, interval))
+        conn.commit()
+
+def load_cadence(source: str, days: int = POLL_LEARN_DAYS) -> dict:
+    """
+    What the poll log says about a source:
+      rates       - local hour -> section changes per hour, smoothed towards the prior
+      full_bytes  - mean size of a 200 response
+      bytes_today - bytes fetched since local midnight
+    """
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT extract(hour FROM polled_at AT TIME ZONE %(tz)s)::int AS h,
+                   count(*) FILTER (WHERE changed),
+                   count(DISTINCT (polled_at AT TIME ZONE %(tz)s)::date)
+            FROM source_poll_log
+            WHERE source = %(src)s AND polled_at > now() - make_interval(days => %(days)s)
+            GROUP BY h
+        """, {"tz": str(TZ), "src": source, "days": days})
+        seen = {h: (changes, n_days) for h, changes, n_days in cur.fetchall()}
+        cur.execute("""
+            SELECT avg(bytes) FILTER (WHERE status = 200),
+                   coalesce(sum(bytes) FILTER (WHERE polled_at >= date_trunc('day', now() AT TIME ZONE %(tz)s) AT TIME ZONE %(tz)s), 0)
+            FROM source_poll_log
+            WHERE source = %(src)s AND polled_at > now() - make_interval(days => %(days)s)
+        """, {"tz": str(TZ), "src": source, "days": days})
+        full_bytes, bytes_today = cur.fetchone()
+    rates = {}
+    for h in range(24):
+        changes, n_days = seen.get(h, (0, 0))
+        rates[h] = (changes + PRIOR_CHANGES) / (n_days + PRIOR_DAYS)
+    return {"rates": rates, "full_bytes": float(full_bytes or 0), "bytes_today": int(bytes_today)}
+
+def prune_poll_log(days: int = 2 * POLL_LEARN_DAYS) -> int:
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM source_poll_log WHERE polled_at < now() - make_interval(days => %s)", (days,))
+        conn.commit()
+        return cur.rowcount
+
+def plan_delay(now: datetime, rates: dict[int, float], unchanged: int = 0, errors: int = 0) -> float:
+    """
+    Seconds until the next poll: walk forward in 5-minute steps through the
+    learned hourly change rates until the expected number of changes reaches
+    POLL_TARGET_CHANGES (stretched by the unchanged streak), so likely hours
+    are polled often and quiet ones rarely. Errors back off exponentially.
+    Clamped to [POLL_MIN_SECONDS, POLL_MAX_SECONDS]; inactive hours are skipped.
+    """
+    if errors:
+        return min(POLL_MAX_SECONDS, POLL_MIN_SECONDS * 2 ** errors)
+    target = POLL_TARGET_CHANGES * min(POLL_BACKOFF ** unchanged, POLL_BACKOFF_MAX)
+    step, waited, expected = 300.0, 0.0, 0.0
+    t = now
+    while waited < POLL_MAX_SECONDS:
+        if t.hour in ACTIVE_HOURS:
+            expected += rates.get(t.hour, 0.0) * step / 3600
+        waited += step
+        t = now + timedelta(seconds=waited)
+        if expected >= target:
+            break
+    return min(max(waited, POLL_MIN_SECONDS), POLL_MAX_SECONDS)
+
+def until_active(now: datetime) -> float:
+    """Seconds until the next active local hour begins (0 inside one)."""
+    if now.hour in ACTIVE_HOURS or not ACTIVE_HOURS:
+        return 0.0
+    t = now.replace(minute=0, second=0, microsecond=0)
+    while t.hour not in ACTIVE_HOURS:
+        t += timedelta(hours=1)
+    return (t.astimezone(timezone.utc) - now.astimezone(timezone.utc)).total_seconds()
+
+def active_left(now: datetime) -> float:
+    """Seconds until the current run of active hours ends, or local midnight (when the byte budget resets)."""
+    t = now.replace(minute=0, second=0, microsecond=0)
+    while t.hour in ACTIVE_HOURS:
+        t += timedelta(hours=1)
+        if t.hour == 0:
+            break
+    return max(0.0, (t.astimezone(timezone.utc) - now.astimezone(timezone.utc)).total_seconds())
+
+def until_next_day(now: datetime) -> float:
+    """Seconds until the first active hour of the next local day (when the daily byte budget resets)."""
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=now.tzinfo)
+    # differences in UTC, so a DST change tonight does not skew the wait by an hour
+    return (midnight.astimezone(timezone.utc) - now.astimezone(timezone.utc)).total_seconds() + until_active(midnight)
+
+class SourcePoller:
+    """
+    Polls one source on its own adaptive schedule instead of the shared cron.
+    Each poll is a conditional GET (ETag / Last-Modified from source_cache), so a
+    quiet source mostly costs 304s; the daily byte budget of
+    POLL_DAILY_FULL_FETCHES full responses caps the rest. What is left of the
+    budget is spread over the rest of the active window, so a source that
+    ignores validators is still polled until 23:55, only less often. With `leases`, only
+    the replica leading 'source:<name>' polls; the others wait for a failover.
+    """
+
+    def __init__(self, src: Source, run=run_scrape_once, leases: Leases | None = None):
+        self.src = src
+        self.run = run
+        self.leases = leases
+        self.unit = f"source:{src.name}"
+        self.unchanged = 0
+        self.errors = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def poll(self, interval: float | None) -> dict:
+        fences = {self.src.name: self.leases.fence(self.unit)} if self.leases is not None else None
+        res = (await self.run([self.src], fences))[0]
+        if "error" in res or (res.get("status") or 0) >= 500:
+            self.errors += 1
+        else:
+            self.errors = 0
+            self.unchanged = 0 if res.get("changed") else self.unchanged + 1
+        try:
+            await asyncio.to_thread(record_poll, self.src.name, res, interval)
+        except Exception as e:
+            logging.warning(f"[{self.src.name}] poll log write failed: {e}")
+        return res
+
+    async def next_delay(self) -> float:
+        now = datetime.now(TZ)
+        wait = until_active(now)
+        if wait:
+            return wait + random.uniform(0, POLL_MIN_SECONDS)
+        try:
+            cad = await asyncio.to_thread(load_cadence, self.src.name)
+        except Exception as e:
+            logging.warning(f"[{self.src.name}] cadence unavailable ({e}); polling at the maximum interval")
+            return POLL_MAX_SECONDS
+        delay = plan_delay(now, cad["rates"], self.unchanged, self.errors)
+        if cad["full_bytes"]:
+            fetches_left = POLL_DAILY_FULL_FETCHES - cad["bytes_today"] / cad["full_bytes"]
+            if fetches_left < 1:
+                # overspent (larger pages than usual): nothing left until tomorrow's budget
+                logging.info(f"[{self.src.name}] daily byte budget spent ({cad['bytes_today']} B); pausing until tomorrow")
+                return until_next_day(now) + random.uniform(0, POLL_MIN_SECONDS)
+            # pace the full fetches left over the rest of today's window instead of spending them early
+            delay = max(delay, active_left(now) / fetches_left)
+        return max(POLL_MIN_SECONDS / 2, delay * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER))
+
+    async def _loop(self):
+        interval = None
+        while True:
+            if self.leases is not None and not self.leases.holds(self.unit):
+                # follower: a new leader polls right away, the learned cadence lives in the poll log
+                interval = None
+                await asyncio.sleep(LEADER_RENEW_SECONDS)
+                continue
+            try:
+                if self.leases is not None:
+                    self.leases.busy.add(self.unit)
+                await self.poll(interval)
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"[{self.src.name}] poll failed: {type(e).__name__}: {e}")
+            finally:
+                if self.leases is not None:
+                    self.leases.busy.discard(self.unit)
+            interval = await self.next_delay()
+            POLL_INTERVAL.labels(self.src.name).set(interval)
+            logging.info(f"[{self.src.name}] next poll in {interval / 60:.1f} min "
+                         f"(unchanged={self.unchanged} errors={self.errors})")
+            await asyncio.sleep(interval)
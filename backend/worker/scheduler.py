@@ -1,112 +1,114 @@
 # backend/worker/scheduler.py
-import os, psycopg, zoneinfo, logging, asyncio
-from dotenv import load_dotenv
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-
-from worker.notifier import notify_users_about_incidents, testNot
-from .scrape import SOURCES, fetch, section_hash, geocode_address
-from .dbio import load_cache, save_cache, upsert_incident
-from .parser import parse
+import os, zoneinfo, logging, asyncio
 from pathlib import Path
+from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parents[1]
+# the one .env load for the worker; it must run before the modules below read their settings
 load_dotenv(BASE_DIR / ".env")
 
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from worker.notifier import drain_pending_mail
+from .pipeline import run_scrape_once, close_http_client
+from .metrics import start_metrics_server
+from .jobs import JobRunner, prune_jobs
+from .dbio import maintain_history_partitions
+from .polling import SourcePoller, prune_poll_log
+from .scrape import SOURCES
+from .leader import Leases
+from . import tasks  # noqa: F401  registers the job handlers
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 TZ = os.getenv("APP_TZ", "Europe/Belgrade")
+# 'adaptive': one learned-cadence poller per source (worker.polling); 'cron': the fixed hourly run
+SCRAPE_SCHEDULE = os.getenv("SCRAPE_SCHEDULE", "adaptive")
+# singleton housekeeping (pruning, partitions) runs on whichever replica leads this unit
+MAINTENANCE_UNIT = "maintenance"
 
-def get_conn():
-    return psycopg.connect(DATABASE_URL)
-
-async def run_scrape_once():
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute("UPDATE incident SET seen = False")
-        conn.commit()
-    changed_any = False
-    for src in SOURCES:
-        cache = load_cache(src.url)
-        resp = fetch(src.url, cache.get("etag"), cache.get("last_modified"))
-        if resp.status_code == 304:
-            logging.info(f"[{src.name}] 304 Not Modified")
-            continue
-        if resp.status_code != 200:
-            logging.warning(f"[{src.name}] HTTP {resp.status_code}")
-            continue
-
-        new_etag = resp.headers.get("ETag")
-        new_lm   = resp.headers.get("Last-Modified")
-
-        h, text, used = section_hash(resp.text, src.selector)
-        import logging
-        logging.info(f"[{src.name}] used={used} html_len={len(resp.text)} section_len={len(text)}")
-        if not h:
-            logging.warning(f"[{src.name}] No date panel found (today). Skipping insert.")
-            return
-
-        items = parse(src.name, text)
-        inserted, updated = 0, 0
-        new_incidents = []
-
-        for it in items:
-            address = (it.get("address_text") or "").strip()
-            lat, lon = None, None
-            if address:
-                lat, lon = geocode_address(address)
-           
-            incident = {
-                "title": (it.get("title") or "").strip(),
-                "description": (it.get("description") or "").strip(),
-                "address_text": address,
-                "lat": lat,
-                "lon": lon
-            }
-
-            is_new = upsert_incident(
-                src.name, src.url,
-                incident["title"],
-                incident["description"],
-                incident["address_text"],
-                incident["lat"],
-                incident["lon"],
-            )
-
-            if is_new: 
-                new_incidents.append(incident)
-                inserted += 1 
-            else: 
-                updated  += 1
-       
-        if new_incidents:
-            await notify_users_about_incidents(new_incidents)        
-        # await testNot()
-
-        changed_any = changed_any or (inserted + updated > 0)
-        save_cache(src.url, new_etag, new_lm, h)
-        logging.info(f"[{src.name}] inserted={inserted} updated={updated}")
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute("DELETE FROM incident WHERE seen = False")
-        conn.commit()
-    if changed_any:
-        logging.info("Changes detected → (email would be sent here).")
+def source_unit(name: str) -> str:
+    return f"source:{name}"
 
 async def main():
+    start_metrics_server()
+    # replicas split the sources and the housekeeping between them; job queue and
+    # outbox drains run everywhere (their claims are SKIP LOCKED)
+    leases = Leases([*(source_unit(s.name) for s in SOURCES), MAINTENANCE_UNIT])
+    await leases.start(DATABASE_URL)
+
+    async def scrape_led_sources():
+        led = [s for s in SOURCES if leases.holds(source_unit(s.name))]
+        if not led:
+            return []
+        for s in led:
+            leases.busy.add(source_unit(s.name))
+        try:
+            return await run_scrape_once(led, {s.name: leases.fence(source_unit(s.name)) for s in led})
+        finally:
+            for s in led:
+                leases.busy.discard(source_unit(s.name))
+
     scheduler = AsyncIOScheduler(timezone=zoneinfo.ZoneInfo(TZ))
-    # 55th minute, hours 6..23 inclusive (06:55 → 23:55)
+    pollers = []
+    if SCRAPE_SCHEDULE == "cron":
+        # 55th minute, hours 6..23 inclusive (06:55 → 23:55)
+        scheduler.add_job(
+            scrape_led_sources,
+            CronTrigger(minute=55, hour="6-23"),
+            coalesce=True,              # collapse missed runs into one
+            misfire_grace_time=300,     # 5 minutes grace
+            id="hourly-scrape",
+            replace_existing=True,
+        )
+    else:
+        pollers = [SourcePoller(src, leases=leases) for src in SOURCES]
+    scheduler.add_job(
+        leases.guard(MAINTENANCE_UNIT, asyncio.to_thread),
+        CronTrigger(hour=4, minute=30),
+        args=[prune_poll_log],
+        id="poll-log-prune",
+        replace_existing=True,
+    )
+    # retries for notifications that failed to send
+    scheduler.add_job(
+        drain_pending_mail,
+        IntervalTrigger(minutes=int(os.getenv("OUTBOX_DRAIN_MINUTES", "2"))),
+        coalesce=True,
+        max_instances=1,
+        id="outbox-drain",
+        replace_existing=True,
+    )
+    jobs = JobRunner()
+    await jobs.start(DATABASE_URL)
+    scheduler.add_job(
+        leases.guard(MAINTENANCE_UNIT, prune_jobs),
+        CronTrigger(hour=4, minute=10),
+        args=[jobs.pool],
+        id="jobs-prune",
+        replace_existing=True,
+    )
+    # next month's incident_history partition ahead of time, old ones dropped
+    await asyncio.to_thread(maintain_history_partitions)
     scheduler.add_job(
-        run_scrape_once,
-        CronTrigger(minute=55, hour="6-23"),
-        coalesce=True,              # collapse missed runs into one
-        misfire_grace_time=300,     # 5 minutes grace
-        id="hourly-scrape",
+        leases.guard(MAINTENANCE_UNIT, asyncio.to_thread),
+        CronTrigger(hour=4, minute=20),
+        args=[maintain_history_partitions],
+        id="history-partitions",
         replace_existing=True,
     )
     scheduler.start()
 
-    # Optionally run one scrape at startup
-    await run_scrape_once()
+    if pollers:
+        # each poller scrapes once right away, then follows its own cadence
+        for p in pollers:
+            p.start()
+    else:
+        # Optionally run one scrape at startup
+        await scrape_led_sources()
 
     logging.info("Scheduler started. Jobs: %s", scheduler.get_jobs())
 
@@ -117,6 +119,11 @@ async def main():
         pass
     finally:
         scheduler.shutdown(wait=False)
+        for p in pollers:
+            await p.stop()
+        await jobs.stop()
+        await leases.stop()
+        await close_http_client()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,19 +1,19 @@
 # backend/worker/scrape.py
 from dataclasses import dataclass
-from bs4 import BeautifulSoup, NavigableString
 import hashlib, re, requests
+import httpx
+import lxml.html
+from lxml import etree
 from datetime import datetime
+from typing import TYPE_CHECKING
 try:
     from zoneinfo import ZoneInfo  # py3.9+
 except Exception:
     ZoneInfo = None
-import requests
-from pathlib import Path
-from dotenv import load_dotenv
 import os
 
-BASE_DIR = Path(__file__).resolve().parents[1]
-load_dotenv(BASE_DIR / ".env")
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup   # imported on first use; see _section_soup
 
 GEOAPIFY_KEY = os.getenv("GEOAPIFY_KEY")
 
@@ -24,6 +24,8 @@ class Source:
     name: str
     url: str
     selector: str  # unused
+    timeout: float = 20.0     # per HTTP request
+    max_concurrency: int = 1  # in-flight runs of this source (overlapping scrapes queue up)
 
 SOURCES = [
     Source("BVK", "https://www.bvk.rs/kvarovi-na-mrezi/", ""),
@@ -45,24 +47,29 @@ CONTENT_CANDIDATES = [
     ".elementor-accordion-content",
 ]
 
-def geocode_address(address):
-    url = "https://api.geoapify.com/v1/geocode/search"
+GEOAPIFY_URL = "https://api.geoapify.com/v1/geocode/search"
+
+# one keep-alive session for all geocoder calls (safe to share across the geocache threads)
+_geo_session = requests.Session()
+_geo_session.headers.update(HEADERS)
+
+def geocode_remote(address: str) -> tuple[float | None, float | None]:
+    """
+    Uncached Geoapify lookup; callers should go through worker.geocache.
+    Returns (None, None) when Geoapify has no match, raises on HTTP/network errors
+    so the cache never stores a transient failure as a negative answer.
+    """
     params = {
         "text": f"Beograd, Serbia, {address}",
         "apiKey": GEOAPIFY_KEY
     }
+    response = _geo_session.get(GEOAPIFY_URL, params=params, timeout=10)
+    response.raise_for_status()
+    data = response.json()
 
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if data["features"]:
-            coords = data["features"][0]["geometry"]["coordinates"]
-            return coords[1], coords[0]  # lat, lon
-    except Exception as e:
-        print(f"Geocoding failed: {e}")
-
+    if data["features"]:
+        coords = data["features"][0]["geometry"]["coordinates"]
+        return coords[1], coords[0]  # lat, lon
     return None, None
 
 def _belgrade_today() -> tuple[int, int, int]:
@@ -88,7 +95,7 @@ def _build_date_regex_fuzzy(day: int, mon: int, year: int) -> re.Pattern:
     tail = r"(?:\.)?(?:\s*(?:год\.?|године))?(?:\s*\([^)]+\))?"
     return re.compile(base + tail, flags=re.U | re.I)
 
-def _find_date_title(soup: BeautifulSoup, date_re: re.Pattern):
+def _find_date_title(soup: "BeautifulSoup", date_re: re.Pattern):
     # Search candidate “title” elements first
     for sel in TITLE_CANDIDATES:
         for el in soup.select(sel):
@@ -103,6 +110,7 @@ def _find_date_title(soup: BeautifulSoup, date_re: re.Pattern):
     return None, "(no-date-title)", ""
 
 def _iter_meaningful_siblings(node):
+    from bs4 import NavigableString
     sib = node.next_sibling
     while sib is not None:
         if isinstance(sib, NavigableString):
@@ -112,7 +120,7 @@ def _iter_meaningful_siblings(node):
         yield sib
         sib = sib.next_sibling
 
-def _find_content_for_title(title_el, soup: BeautifulSoup):
+def _find_content_for_title(title_el, soup: "BeautifulSoup"):
     # 1) aria-controls → panel
     ac = title_el.get("aria-controls")
     if ac:
@@ -150,28 +158,167 @@ def _find_content_for_title(title_el, soup: BeautifulSoup):
 
     return None, "(date-title-found-but-no-content)"
 
-def section_hash(html: str, _unused_selector: str):
+# ---- fast path: lxml directly, precompiled XPath, per-source strategy memo ----
+
+def _xp_cls(c: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {c} ')"
+
+# same candidates (and labels) as TITLE_CANDIDATES, as compiled XPath
+TITLE_XPATHS = {
+    ".elementor-accordion-title": etree.XPath(f"//*[{_xp_cls('elementor-accordion-title')}]"),
+    ".elementor-tab-title": etree.XPath(f"//*[{_xp_cls('elementor-tab-title')}]"),
+    ".elementor-toggle-title": etree.XPath(f"//*[{_xp_cls('elementor-toggle-title')}]"),
+    ".elementor-accordion-item .elementor-accordion-title": etree.XPath(
+        f"//*[{_xp_cls('elementor-accordion-item')}]//*[{_xp_cls('elementor-accordion-title')}]"),
+    ".elementor-toggle-item .elementor-toggle-title": etree.XPath(
+        f"//*[{_xp_cls('elementor-toggle-item')}]//*[{_xp_cls('elementor-toggle-title')}]"),
+    "[role='tab']": etree.XPath("//*[@role='tab']"),
+    "button[aria-controls]": etree.XPath("//button[@aria-controls]"),
+    "a[aria-controls]": etree.XPath("//a[@aria-controls]"),
+    "h1": etree.XPath("//h1"), "h2": etree.XPath("//h2"), "h3": etree.XPath("//h3"), "h4": etree.XPath("//h4"),
+}
+CONTENT_XPATHS = {sel: etree.XPath(f".//*[{_xp_cls(sel.strip('.'))}]") for sel in CONTENT_CANDIDATES}
+_ITEM_CLASSES = ("elementor-accordion-item", "elementor-toggle-item")
+_SKIP_TEXT_TAGS = {"script", "style"}
+
+# source key -> title selector that found today's panel last time
+_title_strategy: dict[str, str] = {}
+
+def _lx_strings(el):
+    """Text nodes the way BeautifulSoup.get_text() sees them (no comments/script/style)."""
+    if el.text and el.tag not in _SKIP_TEXT_TAGS:
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str) and child.tag not in _SKIP_TEXT_TAGS:
+            yield from _lx_strings(child)
+        if child.tail:
+            yield child.tail
+
+def _lx_text(el, sep: str = " ") -> str:
+    return sep.join(t for t in (s.strip() for s in _lx_strings(el)) if t)
+
+def _lx_has_text(el) -> bool:
+    return any(s.strip() for s in _lx_strings(el))
+
+def _lx_classes(el) -> str:
+    return " ".join((el.get("class") or "").split())
+
+def _lx_find_date_title(doc, date_re: re.Pattern, hint: str | None):
+    order = list(TITLE_XPATHS)
+    if hint in TITLE_XPATHS:
+        order.remove(hint)
+        order.insert(0, hint)
+    for sel in order:
+        for el in TITLE_XPATHS[sel](doc):
+            txt = _norm(_lx_text(el))
+            if date_re.search(txt):
+                return el, sel, txt
+    return None, "(no-date-title)", ""
+
+def _lx_meaningful_siblings(el):
+    # mirrors _iter_meaningful_siblings: non-blank text runs count as siblings too
+    if el.tail and _norm(el.tail):
+        yield None
+    for sib in el.itersiblings():
+        if not isinstance(sib.tag, str):
+            if sib.text and _norm(sib.text):
+                yield None
+        else:
+            yield sib
+        if sib.tail and _norm(sib.tail):
+            yield None
+
+def _lx_find_content_for_title(title_el, doc):
+    ac = title_el.get("aria-controls")
+    if ac:
+        panel = doc.get_element_by_id(ac, None)
+        if panel is not None and _lx_has_text(panel):
+            return panel, f"aria-controls→#{ac}"
+
+    for idx, sib in enumerate(_lx_meaningful_siblings(title_el)):
+        if sib is not None and sib.tag not in _SKIP_TEXT_TAGS:
+            classes = _lx_classes(sib)
+            if classes:
+                for sel in CONTENT_CANDIDATES:
+                    if sel.strip(".") in classes and _lx_has_text(sib):
+                        return sib, f"next-sibling[{idx}] self→{sel}"
+            for sel in CONTENT_CANDIDATES:
+                inner = next(iter(CONTENT_XPATHS[sel](sib)), None)
+                if inner is not None and _lx_has_text(inner):
+                    return inner, f"next-sibling[{idx}] inner→{sel}"
+        if idx >= 6:  # don’t scan too far
+            break
+
+    for parent in title_el.iterancestors():
+        classes = _lx_classes(parent)
+        if any(key in classes for key in _ITEM_CLASSES):
+            for sel in CONTENT_CANDIDATES:
+                node = next(iter(CONTENT_XPATHS[sel](parent)), None)
+                if node is not None and _lx_has_text(node):
+                    return node, f"parent-item→{sel}"
+            break
+
+    return None, "(date-title-found-but-no-content)"
+
+def _section_fast(html: str, date_re: re.Pattern, key: str | None):
+    """lxml engine; returns None when it cannot decide, so the caller falls back to BeautifulSoup."""
+    try:
+        doc = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+    title_el, title_sel, title_text = _lx_find_date_title(doc, date_re, _title_strategy.get(key))
+    if title_el is None:
+        return None
+    content_node, how = _lx_find_content_for_title(title_el, doc)
+    if content_node is None:
+        return None
+    if key is not None:
+        _title_strategy[key] = title_sel
+    text = _norm(_lx_text(content_node, "\n"))
+    return text, f"title={title_sel} title_text='{title_text}' {how} engine=lxml"
+
+def _section_soup(html: str, date_re: re.Pattern, d: int, m: int, y: int):
+    # BeautifulSoup is only the fallback engine; load it the first time the lxml path gives up
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(html, "lxml")
-    d, m, y = _belgrade_today()
-    date_re = _build_date_regex_fuzzy(d, m, y)
 
     title_el, title_sel, title_text = _find_date_title(soup, date_re)
     if not title_el:
         used = f"{title_sel} expected≈{d:02d}.{m:02d}.{y}."
-        return None, "", used
+        return None, used
 
     content_node, how = _find_content_for_title(title_el, soup)
     if not content_node:
         used = f"title={title_sel} title_text='{title_text}' {how}"
-        return None, "", used
+        return None, used
 
     text = _norm(content_node.get_text("\n", strip=True))
-    h = hashlib.sha1(text.encode("utf-8")).hexdigest()
     used = f"title={title_sel} title_text='{title_text}' {how}"
+    return text, used
+
+def section_hash(html: str, _unused_selector: str, key: str | None = None, engine: str = "auto"):
+    """
+    Today's outage panel → (sha1, text, how-it-was-found).
+    engine='auto' tries the lxml fast path first (remembering, per `key`, which title
+    selector worked) and falls back to the BeautifulSoup scan only when it finds nothing.
+    engine='soup' / 'lxml' force one engine (benchmarks).
+    """
+    d, m, y = _belgrade_today()
+    date_re = _build_date_regex_fuzzy(d, m, y)
+
+    res = _section_fast(html, date_re, key) if engine in ("auto", "lxml") else None
+    if res is None and engine == "lxml":
+        return None, "", f"(no-date-title) engine=lxml expected≈{d:02d}.{m:02d}.{y}."
+    text, used = res if res is not None else _section_soup(html, date_re, d, m, y)
+    if text is None:
+        return None, "", used
+
+    h = hashlib.sha1(text.encode("utf-8")).hexdigest()
     return h, text, used
 
-def fetch(url: str, etag: str | None, last_modified: str | None):
+async def fetch(client: httpx.AsyncClient, url: str, etag: str | None, last_modified: str | None,
+                timeout: float = 20.0) -> httpx.Response:
     headers = HEADERS.copy()
     if etag: headers["If-None-Match"] = etag
     if last_modified: headers["If-Modified-Since"] = last_modified
-    return requests.get(url, headers=headers, timeout=20)
+    return await client.get(url, headers=headers, timeout=timeout)
@@ -0,0 +1,57 @@
+# backend/worker/tasks.py
+# Job handlers for worker.jobs; importing this module registers them.
+import asyncio
+
+from .dbio import notify_incident_changes
+from .geocache import geocode_cached, geocode_user_addresses
+from .jobs import enqueue, handler
+from .notifier import notify_newUser_about_incidents, notify_users_about_incidents
+from .timing import stage
+
+NEW_USER_RECENT_INCIDENTS = 500
+
+@handler("geocode_user")
+async def geocode_user(pool, payload: dict):
+    """Fill "user".addressLat/addressLon; with notify=true, queue the welcome match afterwards."""
+    row = await pool.fetchrow('SELECT id, email, addressOfUser FROM "user" WHERE id = $1', payload["user_id"])
+    if row is None:
+        return
+    addresses = row["addressofuser"] or []
+    # strict: a geocoder outage fails the job, which the queue retries with backoff
+    lats, lons = await asyncio.to_thread(geocode_user_addresses, addresses, True)
+    # skip if the subscriber edited their addresses meanwhile; that edit queued its own job
+    await pool.execute("""
+        UPDATE "user" SET addressLat = $1, addressLon = $2
+        WHERE id = $3 AND addressOfUser IS NOT DISTINCT FROM $4
+    """, lats, lons, row["id"], addresses)
+    if payload.get("notify"):
+        async with pool.acquire() as conn:
+            await enqueue(conn, "notify_new_user", {"email": row["email"]},
+                          dedupe_key=f"notify_new_user:{row['email']}")
+
+@handler("notify_incidents")
+async def notify_incidents(pool, payload: dict):
+    """Match incidents a scrape inserted (queued by dbio.apply_source_diff) against subscribers and mail them."""
+    rows = await pool.fetch("SELECT * FROM incident WHERE id = ANY($1::bigint[]) ORDER BY id", payload["incident_ids"])
+    # incidents archived meanwhile are skipped; the outbox dedupe key makes a retry a no-op for mail already queued
+    with stage("notify"):
+        await notify_users_about_incidents([dict(r) for r in rows])
+
+@handler("notify_new_user")
+async def notify_new_user(pool, payload: dict):
+    rows = await pool.fetch("SELECT * FROM incident ORDER BY created_at DESC LIMIT $1", NEW_USER_RECENT_INCIDENTS)
+    # the outbox dedupe key makes a retried job a no-op for mail already queued
+    await notify_newUser_about_incidents(payload["email"], [dict(r) for r in rows])
+
+@handler("geocode_incident")
+async def geocode_incident(pool, payload: dict):
+    """Coordinates for an admin-approved report, then the usual change notification."""
+    row = await pool.fetchrow("SELECT address_text, lat FROM incident WHERE id = $1", payload["incident_id"])
+    if row is None or row["lat"] is not None:
+        return
+    lat, lon = await asyncio.to_thread(geocode_cached, row["address_text"], True)
+    if lat is None or lon is None:
+        return
+    await pool.execute("UPDATE incident SET lat = $1, lon = $2, updated_at = now() WHERE id = $3",
+                       lat, lon, payload["incident_id"])
+    await asyncio.to_thread(notify_incident_changes)
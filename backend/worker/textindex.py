@@ -0,0 +1,46 @@
+# backend/worker/textindex.py
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from .parser import OPS_BY_KEY, split_address
+from .textnorm import normalize_key, clean_address
+
+class SubscriberTextIndex:
+    """
+    Inverted index over subscribers' preferences, keyed with normalize_key():
+      by_area:    municipality key      -> subscriber positions
+      by_address: canonical address key -> subscriber positions
+    Built once per notifier run; each incident is then two or three dict lookups.
+    Positions are indices into the user list the index was built from.
+    """
+
+    def __init__(self, users: Iterable[Dict] = ()):
+        self.by_area: Dict[str, set] = defaultdict(set)
+        self.by_address: Dict[str, set] = defaultdict(set)
+        for i, user in enumerate(users):
+            self.add(i, user)
+
+    def add(self, pos: int, user: Dict):
+        for a in user.get("areas") or []:
+            key = normalize_key(a)
+            if key:
+                self.by_area[key].add(pos)
+        for a in user.get("addressofuser") or []:
+            key = normalize_key(clean_address(a))
+            if key:
+                self.by_address[key].add(pos)
+
+    def lookup(self, incident: Dict) -> set:
+        address = incident.get("address_text") or ""
+        opst, street = split_address(address)
+        out = set()
+        area_key = normalize_key(opst)
+        if area_key in OPS_BY_KEY:
+            out |= self.by_area.get(area_key, set())
+        for key in (normalize_key(address), normalize_key(street)):
+            if key:
+                out |= self.by_address.get(key, set())
+        return out
+
+    def lookup_many(self, incidents: List[Dict]) -> List[set]:
+        return [self.lookup(inc) for inc in incidents]
@@ -0,0 +1,29 @@
+# backend/worker/textnorm.py
+import re
+import cyrtranslit
+from unidecode import unidecode
+
+_NON_WORD_RE = re.compile(r"[^0-9a-z]+")
+
+def to_latin(s: str) -> str:
+    return cyrtranslit.to_latin(s or "")
+
+def normalize_key(s: str | None) -> str:
+    """
+    Script-insensitive lookup key:
+      'Нови Београд, Булевар Михајла Пупина 10' and
+      'novi beograd,  bulevar mihajla pupina 10' -> 'novi beograd bulevar mihajla pupina 10'
+    - Cyrillic → Latin (cyrtranslit), then diacritics stripped (unidecode)
+    - đ is spelled 'dj' so 'Đorđa' and 'Djordja' agree
+    - lowercase, punctuation collapsed to single spaces
+    """
+    if not s:
+        return ""
+    s = to_latin(str(s)).replace("đ", "dj").replace("Đ", "Dj")
+    s = unidecode(s).lower()
+    return _NON_WORD_RE.sub(" ", s).strip()
+
+def clean_address(s: str | None) -> str:
+    """Strip the array/quote debris user addresses arrive with ('{"Bulevar ..."}')."""
+    s = str(s or "").strip().strip("{}\"' ")
+    return s.replace("\n", " ").strip()
@@ -0,0 +1,50 @@
+# backend/worker/timing.py
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    from opentelemetry import trace
+except Exception:
+    trace = None
+
+# no-op unless an OpenTelemetry SDK/exporter is configured in the process
+_tracer = trace.get_tracer("h2o.worker") if trace is not None else None
+
+class StageTimer:
+    """
+    Cumulative wall time and call count per scrape stage. Cheap enough to stay on
+    in production; bench/replay.py reads and resets it around each round, and
+    listeners (worker.metrics) receive every sample.
+    """
+
+    def __init__(self):
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.calls: dict[str, int] = defaultdict(int)
+        self.listeners: list = []      # fn(stage, seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            if _tracer is None:
+                yield
+            else:
+                with _tracer.start_as_current_span(f"scrape.{name}"):
+                    yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.seconds[name] += elapsed
+            self.calls[name] += 1
+            for fn in self.listeners:
+                fn(name, elapsed)
+
+    def snapshot(self) -> dict:
+        return {k: {"seconds": round(v, 6), "calls": self.calls[k]} for k, v in self.seconds.items()}
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+
+stages = StageTimer()
+stage = stages.stage
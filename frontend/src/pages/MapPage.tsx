@@ -1,8 +1,8 @@
 import "./MapPage.css";
 import "leaflet/dist/leaflet.css";
 
-import React, { useState, useEffect, useRef } from "react";
-import { MapContainer, TileLayer, Marker, Popup, useMap } from "react-leaflet";
+import React, { useState, useEffect, useRef, useCallback } from "react";
+import { MapContainer, TileLayer, Marker, Popup, useMap, useMapEvents } from "react-leaflet";
 import type { Map as LeafletMap, LatLngBoundsExpression, DivIcon } from "leaflet";
 import L from "leaflet";
 import { useI18n } from "../i18n.js";
@@ -25,16 +25,22 @@ const BELGRADE_BOUNDS: LatLngBoundsExpression = [
   [44.95, 20.65], // NE
 ];
 
-type Failure = {
-  id: number;
+type Status = "active" | "resolved" | "planned";
+
+// one GeoJSON feature of /incidents/geojson: a single incident or a server-side cluster
+type MapFeature = {
+  id: number | string;
   lat: number;
   lon: number;
+  cluster: boolean;
+  count: number;
+  expansionZoom: number;
   address: string;
   description: string;
-  status: "active" | "resolved" | "planned";
+  status: Status;
 };
 
-function dot(status: "active" | "resolved" | "planned"): DivIcon {
+function dot(status: Status): DivIcon {
   const color =
     status === "active" ? "#ef4444" : status === "resolved" ? "#10b981" : "#f59e0b";
   return new L.DivIcon({
@@ -45,6 +51,88 @@ function dot(status: "active" | "resolved" | "planned"): DivIcon {
   });
 }
 
+function clusterIcon(count: number): DivIcon {
+  const size = count < 10 ? 28 : count < 100 ? 34 : 42;
+  return new L.DivIcon({
+    className: "marker-cluster",
+    html: `<span style="width:${size}px;height:${size}px">${count}</span>`,
+    iconSize: [size, size],
+    iconAnchor: [size / 2, size / 2],
+  });
+}
+
+function toFeature(f: any): MapFeature {
+  const p = f.properties || {};
+  const [lon, lat] = f.geometry.coordinates;
+  return {
+    id: f.id,
+    lat,
+    lon,
+    cluster: !!p.cluster,
+    count: p.point_count ?? 1,
+    expansionZoom: p.expansion_zoom ?? 16,
+    address: p.address_text ?? "",
+    description: p.description ?? "",
+    status: p.status ?? "active",
+  };
+}
+
+// Re-fetches clustered features for the visible area after every pan/zoom
+function IncidentLayer({ activeLabel }: { activeLabel: string }) {
+  const map = useMap();
+  const [features, setFeatures] = useState<MapFeature[]>([]);
+  const abortRef = useRef<AbortController | null>(null);
+
+  const load = useCallback(() => {
+    abortRef.current?.abort();
+    const ctrl = new AbortController();
+    abortRef.current = ctrl;
+    const b = map.getBounds();
+    const params = new URLSearchParams({
+      zoom: String(map.getZoom()),
+      bbox: [b.getWest(), b.getSouth(), b.getEast(), b.getNorth()].map((v) => v.toFixed(4)).join(","),
+    });
+    fetch(`${API_BASE_URL}/incidents/geojson?${params.toString()}`, { signal: ctrl.signal })
+      .then((res) => res.json())
+      .then((data) => setFeatures((data.features || []).map(toFeature)))
+      .catch((err) => {
+        if (err.name !== "AbortError") console.error("Failed to fetch incidents", err);
+      });
+  }, [map]);
+
+  useMapEvents({ moveend: load });
+  useEffect(() => {
+    load();
+    return () => abortRef.current?.abort();
+  }, [load]);
+
+  return (
+    <>
+      {features.map((f) =>
+        f.cluster ? (
+          <Marker
+            key={`c${f.id}`}
+            position={[f.lat, f.lon]}
+            icon={clusterIcon(f.count)}
+            eventHandlers={{
+              click: () => map.setView([f.lat, f.lon], Math.min(f.expansionZoom, map.getMaxZoom())),
+            }}
+          />
+        ) : (
+          <Marker key={f.id} position={[f.lat, f.lon]} icon={dot(f.status)}>
+            <Popup>
+              <strong>{f.address}</strong>
+              <div style={{ marginTop: 6, fontSize: 12, color: "#6b7280" }}>
+                {activeLabel}
+              </div>
+            </Popup>
+          </Marker>
+        )
+      )}
+    </>
+  );
+}
+
 function AssignMapRef({ onReady }: { onReady: (m: LeafletMap) => void }) {
   const map = useMap();
   useEffect(() => {
@@ -56,30 +144,9 @@ function AssignMapRef({ onReady }: { onReady: (m: LeafletMap) => void }) {
 export default function MapPage() {
   const { t } = useI18n();
   const mapRef = useRef<LeafletMap | null>(null);
-  const [failures, setFailures] = useState<Failure[]>([]);
 
   const apiKey = import.meta.env.VITE_GEOAPIFY_KEY;
 
-  useEffect(() => {
-    fetch(`${API_BASE_URL}/incidents`)
-    .then((res) => res.json())
-      .then((data) => {
-        const clean = data
-          .filter((r: any) => typeof r.lat === "number" && typeof r.lon === "number")
-          .map((r: any) => ({
-            id: r.id,
-            lat: r.lat,
-            lon: r.lon,
-            address: r.address_text,
-            description: r.description,
-            status: r.status,
-          }));
-        console.log("[filtered incidents]", clean);
-        setFailures(clean);
-      })
-      .catch((err) => console.error("Failed to fetch incidents", err));
-  }, []);
-
   if (!apiKey) {
     return (
       <div className="container" style={{ padding: "16px 0" }}>
@@ -130,18 +197,7 @@ export default function MapPage() {
             detectRetina={false}
           />
 
-          {failures.map((f) =>
-            Number.isFinite(f.lat) && Number.isFinite(f.lon) ? (
-              <Marker key={f.id} position={[f.lat, f.lon]} icon={dot(f.status)}>
-                <Popup>
-                  <strong>{f.address}</strong>
-                  <div style={{ marginTop: 6, fontSize: 12, color: "#6b7280" }}>
-                    {t("map_legend_active")}
-                  </div>
-                </Popup>
-              </Marker>
-            ) : null
-          )}
+          <IncidentLayer activeLabel={t("map_legend_active")} />
         </MapContainer>
       </div>
     </div>
@@ -1,19 +1,20 @@
 // src/ui/AddressAutocomplete.tsx
 import { useEffect, useMemo, useRef, useState } from "react";
 import { useI18n } from "../i18n.js";
+import { API_BASE_URL } from "../lib/apiClient.js";
 import "./AddressAutocomplete.css";
 
+// one /addresses/suggest row: an address as the water utility spells it
 type Result = {
-  place_id: string;
-  display_name: string;
-  lat: string;
-  lon: string;
+  label: string;
+  lat: number | null;
+  lon: number | null;
 };
 
 export type AddressValue = {
   label: string;
-  lat: number;
-  lon: number;
+  lat: number | null;
+  lon: number | null;
 };
 
 export default function AddressAutocomplete({
@@ -33,9 +34,11 @@ export default function AddressAutocomplete({
   const [active, setActive] = useState(0);
   const boxRef = useRef<HTMLDivElement | null>(null);
   const abortRef = useRef<AbortController | null>(null);
+  // label last passed to onSelect, so blur does not re-report it
+  const committedRef = useRef(value?.label ?? "");
 
   // basic debounce
-  const query = useDebounced(input.trim(), 350);
+  const query = useDebounced(input.trim(), 120);
 
   // Close on outside click
   useEffect(() => {
@@ -57,30 +60,11 @@ export default function AddressAutocomplete({
     const ctrl = new AbortController();
     abortRef.current = ctrl;
 
-    // Nominatim search (bounded to Belgrade; country RS)
-    // NOTE: Please keep a nice User-Agent per Nominatim policy.
-    const params = new URLSearchParams({
-      q: query,
-      format: "jsonv2",
-      addressdetails: "1",
-      limit: "8",
-      countrycodes: "rs",
-      // Rough Belgrade bbox: minLon,minLat,maxLon,maxLat
-      // (tweak as you like)
-      viewbox: "20.20,44.68,20.65,44.95",
-      bounded: "1",
-    });
+    // prefix search over addresses seen in the bulletins (Cyrillic or Latin input)
+    const params = new URLSearchParams({ q: query, limit: "8" });
 
     setLoading(true);
-    fetch(`https://nominatim.openstreetmap.org/search?${params.toString()}`, {
-      signal: ctrl.signal,
-      headers: {
-        "Accept": "application/json",
-        // put your project/site as user agent
-        "User-Agent": "H2O-Monitor/1.0 (student project)",
-        "Referrer-Policy": "no-referrer-when-downgrade",
-      },
-    })
+    fetch(`${API_BASE_URL}/addresses/suggest?${params.toString()}`, { signal: ctrl.signal })
       .then(async (r) => {
         if (!r.ok) throw new Error("Search failed");
         const data = (await r.json()) as Result[];
@@ -94,21 +78,36 @@ export default function AddressAutocomplete({
   }, [query]);
 
   function choose(r: Result) {
-    const val: AddressValue = {
-      label: r.display_name,
-      lat: parseFloat(r.lat),
-      lon: parseFloat(r.lon),
-    };
+    const val: AddressValue = { label: r.label, lat: r.lat, lon: r.lon };
     setInput(val.label);
     setOpen(false);
+    committedRef.current = val.label;
     onSelect(val);
   }
 
+  // an address the bulletins never mentioned is still a valid entry: keep the typed text, without coordinates
+  function commitText() {
+    const label = input.trim();
+    if (!label || label === committedRef.current) return;
+    const match = results.find((r) => r.label.toLowerCase() === label.toLowerCase());
+    if (match) {
+      choose(match);
+      return;
+    }
+    setOpen(false);
+    committedRef.current = label;
+    onSelect({ label, lat: null, lon: null });
+  }
+
   function onKeyDown(e: React.KeyboardEvent<HTMLInputElement>) {
-    if (!open && (e.key === "ArrowDown" || e.key === "Enter")) {
+    if (!open && e.key === "ArrowDown") {
       setOpen(true);
       return;
     }
+    if (!open && e.key === "Enter") {
+      commitText();
+      return;
+    }
     if (!open) return;
     if (e.key === "ArrowDown") {
       e.preventDefault();
@@ -120,6 +119,7 @@ export default function AddressAutocomplete({
       e.preventDefault();
       const r = results[active];
       if (r) choose(r);
+      else commitText();
     } else if (e.key === "Escape") {
       setOpen(false);
     }
@@ -137,6 +137,10 @@ export default function AddressAutocomplete({
         value={input}
         onChange={(e) => setInput(e.target.value)}
         onFocus={() => input.trim() && setOpen(true)}
+        onBlur={(e) => {
+          // leaving for a suggestion in the dropdown: its click selects instead
+          if (!boxRef.current?.contains(e.relatedTarget as Node | null)) commitText();
+        }}
         onKeyDown={onKeyDown}
         placeholder={placeholder ?? t("address_placeholder")}
         autoComplete="off"
@@ -155,15 +159,15 @@ export default function AddressAutocomplete({
             results.map((r, i) => (
               <button
                 type="button"
-                key={r.place_id}
+                key={r.label}
                 role="option"
                 aria-selected={i === active}
                 className={`addr__item ${i === active ? "is-active" : ""}`}
                 onMouseEnter={() => setActive(i)}
                 onClick={() => choose(r)}
-                title={r.display_name}
+                title={r.label}
               >
-                {r.display_name}
+                {r.label}
               </button>
             ))}
         </div>